@@ -1,25 +1,92 @@
+import os
+import sys
+
+# Modules shared with the avatar info tool live in shared/ at the top of the repository
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'shared'))
+
 import vrchatapi
 from vrchatapi.api import avatars_api, authentication_api
 from vrchatapi.models import UpdateAvatarRequest
-from block_manager import login
+import metrics
+from api_executor import ApiExecutor
+from block_manager import login, start_metrics
+from moderation_executor import describe_error
+
+# search_avatars returns at most 100 avatars per request
+PAGE_SIZE = 100
+# Updates in flight at once during bulk changes; the rate limiter still sets the pace
+BULK_WORKERS = 4
 
 class AvatarPrivacyManager:
     def __init__(self):
         # Use the existing login function from block_manager
         self.api_client, self.auth_api, _ = login()
         self.avatars_api = avatars_api.AvatarsApi(self.api_client)
+        self.api_executor = None
+        self._user_id = None
+        # In-session cache of owned avatars, filled page by page as they are needed
+        self._avatars = {}
+        self._next_offset = 0
+        self._all_fetched = False
+        self._stale = set()
+
+    def current_user_id(self):
+        """ID of the logged in user, fetched once per session"""
+        if self._user_id is None:
+            self._user_id = self.auth_api.get_current_user().id
+        return self._user_id
+
+    def _fetch_page(self):
+        """Fetch the next page of owned avatars into the cache, returns the new ones"""
+        page = self.avatars_api.search_avatars(
+            user_id=self.current_user_id(),
+            n=PAGE_SIZE,
+            offset=self._next_offset,
+            sort="created",  # Stable order, so privacy changes don't shift later pages
+            order="descending",
+            release_status="all"  # Get both public and private avatars
+        ) or []
+        self._next_offset += len(page)
+        if len(page) < PAGE_SIZE:
+            self._all_fetched = True
+        new = [avatar for avatar in page if avatar.id not in self._avatars]
+        for avatar in new:
+            self._avatars[avatar.id] = avatar
+        return new
+
+    def iter_my_avatars(self):
+        """Lazily yield every owned avatar
+
+        Cached avatars come first; further pages are only requested when the
+        caller iterates past them. Avatars invalidated by a failed update are
+        fetched again on the way.
+        """
+        for avatar_id in list(self._avatars):
+            if avatar_id in self._stale:
+                fresh = self.get_avatar_details(avatar_id)
+                if fresh:
+                    self._avatars[avatar_id] = fresh
+                    self._stale.discard(avatar_id)
+            yield self._avatars[avatar_id]
+        while not self._all_fetched:
+            for avatar in self._fetch_page():
+                yield avatar
+
+    def invalidate(self, avatar_id):
+        """Forget the cached state of one avatar so it is fetched again"""
+        self._stale.add(avatar_id)
+
+    def clear_cache(self):
+        """Drop every cached avatar, e.g. after uploading new ones"""
+        self._avatars = {}
+        self._next_offset = 0
+        self._all_fetched = False
+        self._stale = set()
 
     def get_my_avatars(self):
-        """Get list of your owned avatars"""
+        """Get list of all your owned avatars"""
         try:
-            current_user = self.auth_api.get_current_user()            # Get avatars you own using search
-            avatars = self.avatars_api.search_avatars(
-                user_id=current_user.id,
-                n=100,  # Get up to 100 avatars
-                order="descending",
-                release_status="all"  # Get both public and private avatars
-            )
-            return avatars
+            return list(self.iter_my_avatars())
         except vrchatapi.ApiException as e:
             print(f"Exception when getting avatars: {e}")
             return None
@@ -33,44 +100,129 @@ class AvatarPrivacyManager:
             print(f"Exception when getting avatar details: {e}")
             return None
 
-    def set_avatar_privacy(self, avatar_id, is_private):
+    def _known_avatar(self, avatar_id):
+        """The cached avatar object if it is current, otherwise a fresh GET"""
+        if avatar_id in self._avatars and avatar_id not in self._stale:
+            metrics.inc('cache_lookups_total', cache='avatars', result='hit')
+            return self._avatars[avatar_id]
+        metrics.inc('cache_lookups_total', cache='avatars', result='miss')
+        return self.get_avatar_details(avatar_id)
+
+    def _privacy_request(self, avatar, is_private):
+        """Update request for an avatar object we already have"""
+        # Create update request with all required fields
+        return {
+            "name": avatar.name,
+            "description": avatar.description or "",
+            "releaseStatus": "private" if is_private else "public",
+            "version": avatar.version,
+            "unityPackageUrl": avatar.unity_package_url,
+            "unityVersion": "2019.4.31f1",  # Most commonly used Unity version for VRChat
+            "assetVersion": avatar.version,  
+            "assetUrl": avatar.unity_package_url,  # Same as unityPackageUrl
+            "platform": "standalonewindows",  # PC platform
+            "imageUrl": avatar.image_url
+        }
+
+    def _finish_update(self, avatar, send):
+        """Run or collect an update (send returns the response), keeping the cache in step"""
+        try:
+            updated_avatar = send()
+        except Exception:
+            # The avatar's state on VRChat is unknown now
+            self.invalidate(avatar.id)
+            raise
+        
+        # Only this avatar changed; the response is its new state
+        if avatar.id in self._avatars and updated_avatar:
+            self._avatars[avatar.id] = updated_avatar
+        return updated_avatar
+
+    def _update_privacy(self, avatar, is_private):
+        """Send the update for an avatar object we already have, raises ApiException"""
+        request = self._privacy_request(avatar, is_private)
+        return self._finish_update(avatar, lambda: self.avatars_api.update_avatar(
+            avatar.id,
+            update_avatar_request=request
+        ))
+
+    def set_avatar_privacy(self, avatar_id, is_private, avatar=None):
         """Set an avatar's privacy status
         Args:
             avatar_id (str): The ID of the avatar to update
             is_private (bool): True to make private, False to make public
+            avatar: Already fetched avatar object; skips the extra GET
         """
         try:
-            # First get the current avatar details
-            current_avatar = self.get_avatar_details(avatar_id)
+            # Reuse the avatar from get_my_avatars() when we have it
+            current_avatar = avatar or self._known_avatar(avatar_id)
             if not current_avatar:
                 return None
-
-            # Create update request with all required fields
-            request = {
-                "name": current_avatar.name,
-                "description": current_avatar.description or "",
-                "releaseStatus": "private" if is_private else "public",
-                "version": current_avatar.version,
-                "unityPackageUrl": current_avatar.unity_package_url,
-                "unityVersion": "2019.4.31f1",  # Most commonly used Unity version for VRChat
-                "assetVersion": current_avatar.version,  
-                "assetUrl": current_avatar.unity_package_url,  # Same as unityPackageUrl
-                "platform": "standalonewindows",  # PC platform
-                "imageUrl": current_avatar.image_url
-            }
-            
-            # Send update request 
-            updated_avatar = self.avatars_api.update_avatar(
-                avatar_id,
-                update_avatar_request=request
-            )
-            
-            return updated_avatar
+            return self._update_privacy(current_avatar, is_private)
         except vrchatapi.ApiException as e:
             print(f"Exception when updating avatar privacy: {e}")
             return None
 
+    def bulk_set_privacy(self, avatars, is_private, workers=BULK_WORKERS):
+        """Make many avatars private or public at once
+
+        Uses the avatar objects as given (no GET per avatar), skips avatars
+        already in the wanted state and runs up to workers updates at once on
+        the API client's thread pool; the rate limiter installed at login
+        paces them. Each result is printed as it arrives.
+
+        Returns:
+            tuple: (updated, skipped, failed) - lists of avatars, failed holds (avatar, error)
+        """
+        target = "private" if is_private else "public"
+        todo = [avatar for avatar in avatars if avatar.release_status != target]
+        skipped = [avatar for avatar in avatars if avatar.release_status == target]
+        updated, failed = [], []
+        if skipped:
+            print(f"{len(skipped)} avatars are already {target}")
+        if self.api_executor is None:
+            self.api_executor = ApiExecutor(self.api_client, workers)
+        else:
+            self.api_executor.resize(workers)
+        for avatar in todo:
+            self.api_executor.submit(self.avatars_api.update_avatar, avatar.id,
+                                     update_avatar_request=self._privacy_request(avatar, is_private), tag=avatar)
+        for i, call in enumerate(self.api_executor.as_completed(), 1):
+            avatar = call.tag
+            try:
+                self._finish_update(avatar, call.result)
+                updated.append(avatar)
+                print(f"[{i}/{len(todo)}] [✓] {avatar.name} is now {target}")
+            except Exception as e:
+                # Network and model errors fail this avatar only, like API errors
+                failed.append((avatar, e))
+                if isinstance(e, vrchatapi.ApiException):
+                    reason = f"{e.status} {e.reason}"
+                else:
+                    reason = describe_error(e)
+                print(f"[{i}/{len(todo)}] [!] {avatar.name} ({avatar.id}): {reason}")
+        return updated, skipped, failed
+
+def parse_selection(text, count):
+    """Turn '1,3,5-9' into sorted zero-based indexes below count, or None if invalid"""
+    indexes = set()
+    for part in text.replace(' ', '').split(','):
+        if not part:
+            continue
+        try:
+            if '-' in part:
+                start, end = (int(x) for x in part.split('-', 1))
+            else:
+                start = end = int(part)
+        except ValueError:
+            return None
+        if not 1 <= start <= end <= count:
+            return None
+        indexes.update(range(start - 1, end))
+    return sorted(indexes)
+
 def main():
+    start_metrics()
     manager = AvatarPrivacyManager()
     
     while True:
@@ -78,9 +230,10 @@ def main():
         print("=====================")
         print("1. List all my avatars")
         print("2. Toggle avatar privacy (private/public)")
-        print("3. Exit")
+        print("3. Make many avatars private or public")
+        print("4. Exit")
         
-        choice = input("\nEnter your choice (1-3): ")
+        choice = input("\nEnter your choice (1-4): ")
         
         if choice == "1":
             # Get list of your avatars
@@ -116,7 +269,7 @@ def main():
                         print(f"\nChanging '{avatar.name}' from {avatar.release_status} to {new_status}...")
                         
                         # Update privacy
-                        updated = manager.set_avatar_privacy(avatar.id, make_private)
+                        updated = manager.set_avatar_privacy(avatar.id, make_private, avatar=avatar)
                         if updated:
                             print(f"Avatar privacy updated successfully!")
                             print(f"New status: {updated.release_status}")
@@ -130,11 +283,52 @@ def main():
                 print("\nNo avatars found or failed to fetch avatars")
                 
         elif choice == "3":
+            print("\nFetching your avatars...")
+            avatars = manager.get_my_avatars()
+            if not avatars:
+                print("\nNo avatars found or failed to fetch avatars")
+                continue
+                
+            target = input("\nMake avatars (p)rivate or p(u)blic? ").strip().lower()
+            if target not in ('p', 'u'):
+                print("\nPlease enter p or u")
+                continue
+            make_private = target == 'p'
+            
+            mode = input("Which avatars: (a)ll, (s)elect by number or (f)ilter by name? ").strip().lower()
+            if mode == 'a':
+                selected = avatars
+            elif mode == 's':
+                for i, avatar in enumerate(avatars, 1):
+                    status = "🔒 private" if avatar.release_status == "private" else "🌐 public"
+                    print(f"{i}. {avatar.name} ({status})")
+                indexes = parse_selection(input("\nEnter numbers, e.g. 1,3,5-9: "), len(avatars))
+                if not indexes:
+                    print("\nInvalid selection")
+                    continue
+                selected = [avatars[i] for i in indexes]
+            elif mode == 'f':
+                text = input("Name contains: ").strip().lower()
+                selected = [avatar for avatar in avatars if text in (avatar.name or '').lower()]
+            else:
+                print("\nPlease enter a, s or f")
+                continue
+            
+            if not selected:
+                print("\nNo avatars selected")
+                continue
+            new_status = "private" if make_private else "public"
+            if input(f"\nMake {len(selected)} avatars {new_status}? (y/n): ").lower() != 'y':
+                continue
+            updated, skipped, failed = manager.bulk_set_privacy(selected, make_private)
+            print(f"\n{len(updated)} updated, {len(skipped)} already {new_status}, {len(failed)} failed")
+                
+        elif choice == "4":
             print("\nGoodbye!")
             break
             
         else:
-            print("\nInvalid choice. Please enter a number between 1-3.")
+            print("\nInvalid choice. Please enter a number between 1-4.")
 
 if __name__ == "__main__":
     main()
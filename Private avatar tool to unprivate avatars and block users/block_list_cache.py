@@ -0,0 +1,149 @@
+import json
+import os
+import threading
+import time
+
+import metrics
+
+
+def iter_player_moderations(moderation_api, moderation_type="block"):
+    """Yield the account's player moderations of one type as plain dicts
+
+    The VRChat API returns the whole list from one request (it has no
+    n/offset paging), so this is the single network pass; callers only
+    ever see an iterator and don't need to change if paging is added.
+    """
+    for mod in moderation_api.get_player_moderations(type=moderation_type) or []:
+        yield {
+            'user_id': mod.target_user_id,
+            'display_name': mod.target_display_name,
+            'moderation_id': getattr(mod, 'id', None),
+            'created': str(mod.created) if getattr(mod, 'created', None) else None,
+        }
+
+
+class BlockListSnapshot:
+    """Local copy of the block list shared by listing, searching and syncing
+
+    The list is fetched at most once per ttl seconds and saved to path so
+    later runs start from it too. Blocks and unblocks made through this
+    tool are applied to the snapshot directly (and saved), so it stays
+    current without fetching the list again.
+
+    A snapshot saved by an earlier run is only good enough for listing and
+    searching: it misses blocks made in the VRChat client since. Bulk
+    changes and syncing diff against live_blocked() instead, which fetches
+    the list once per process.
+
+    Args:
+        moderation_api (PlayermoderationApi): API used to fetch the list
+        path (str): Snapshot file
+        ttl (float): Seconds before the snapshot is fetched again
+    """
+
+    def __init__(self, moderation_api, path='block_list_cache.json', ttl=3600):
+        self.moderation_api = moderation_api
+        self.path = path
+        self.ttl = ttl
+        self.fetched_at = 0.0
+        self.fetched_live = False  # Whether this process fetched the list itself
+        self._users = {}  # user_id -> entry from iter_player_moderations()
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        self.fetched_at = data.get('fetched_at', 0.0)
+        self._users = {entry['user_id']: entry for entry in data.get('users', [])}
+
+    def _save_locked(self):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'fetched_at': self.fetched_at, 'users': list(self._users.values())}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    @property
+    def age(self):
+        return time.time() - self.fetched_at
+
+    def is_stale(self):
+        return not self.fetched_at or self.age > self.ttl
+
+    def refresh(self, force=False):
+        """Fetch the block list if the snapshot is stale (or always with force)"""
+        with self._lock:
+            if not force and not self.is_stale():
+                metrics.inc('cache_lookups_total', cache='block_list', result='hit')
+                return False
+            metrics.inc('cache_lookups_total', cache='block_list', result='miss')
+            self._users = {entry['user_id']: entry for entry in iter_player_moderations(self.moderation_api)}
+            self.fetched_at = time.time()
+            self.fetched_live = True
+            self._save_locked()
+            return True
+
+    def blocked(self):
+        """Return {user_id: display_name} for every blocked user"""
+        self.refresh()
+        return {user_id: entry['display_name'] for user_id, entry in self._users.items()}
+
+    def live_blocked(self):
+        """Like blocked(), but never from a snapshot saved by an earlier run"""
+        if not self.fetched_live:
+            self.refresh(force=True)
+        return self.blocked()
+
+    def __contains__(self, user_id):
+        self.refresh()
+        return user_id in self._users
+
+    def __len__(self):
+        self.refresh()
+        return len(self._users)
+
+    def search(self, text=None):
+        """Yield blocked users whose name or ID contains text (case-insensitive), or all of them"""
+        self.refresh()
+        needle = text.lower() if text else None
+        for entry in list(self._users.values()):
+            if needle is None or needle in entry['user_id'].lower() or needle in (entry['display_name'] or '').lower():
+                yield entry
+
+    def pages(self, page_size=50, text=None):
+        """Yield search() results in lists of page_size"""
+        page = []
+        for entry in self.search(text):
+            page.append(entry)
+            if len(page) >= page_size:
+                yield page
+                page = []
+        if page:
+            yield page
+
+    def mark_blocked(self, user_ids, display_names=None):
+        """Record users blocked by this tool without fetching the list again"""
+        display_names = display_names or {}
+        with self._lock:
+            if not self.fetched_at:
+                return  # Nothing cached yet, the next fetch will include them
+            for user_id in user_ids:
+                self._users.setdefault(user_id, {
+                    'user_id': user_id,
+                    'display_name': display_names.get(user_id),
+                    'moderation_id': None,
+                    'created': None,
+                })
+            self._save_locked()
+
+    def mark_unblocked(self, user_ids):
+        """Record users unblocked by this tool without fetching the list again"""
+        with self._lock:
+            if not self.fetched_at:
+                return
+            for user_id in user_ids:
+                self._users.pop(user_id, None)
+            self._save_locked()
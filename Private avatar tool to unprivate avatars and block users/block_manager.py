@@ -1,142 +1,91 @@
-import vrchatapi
-from vrchatapi.api import authentication_api, users_api
-from vrchatapi.exceptions import ApiException, UnauthorizedException
-from vrchatapi.models.two_factor_auth_code import TwoFactorAuthCode
-from vrchatapi.models.two_factor_email_code import TwoFactorEmailCode
-import json
 import os
-import time
-from http.cookiejar import Cookie
 import sys
-import time
-
-def make_cookie(name, value):
-    """Helper to create cookie objects"""
-    return Cookie(
-        version=0,
-        name=name,
-        value=value,
-        port=None,
-        port_specified=False,
-        domain="api.vrchat.cloud",
-        domain_specified=True,
-        domain_initial_dot=False,
-        path="/",
-        path_specified=True,
-        secure=False,
-        expires=None,
-        discard=False,
-        comment=None,
-        comment_url=None,
-        rest={}
-    )
 
-def load_cookies(api_client):
-    """Try loading cookies from file if they exist"""
-    cookie_file = os.path.join(os.path.dirname(__file__), 'vrchat_cookies.json')
-    if not os.path.exists(cookie_file):
-        return False
-        
-    try:
-        with open(cookie_file, 'r') as f:
-            cookies = json.load(f)
-            
-        for name, value in cookies.items():
-            api_client.rest_client.cookie_jar.set_cookie(
-                make_cookie(name, value)
-            )
-        return True
-    except Exception as e:
-        print(f"[!] Error loading cookies: {str(e)}")
-        return False
-
-def save_cookies(api_client):
-    """Save cookies to file for future use"""
-    cookie_file = os.path.join(os.path.dirname(__file__), 'vrchat_cookies.json')
-    try:
-        cookies = {
-            cookie.name: cookie.value
-            for cookie in api_client.rest_client.cookie_jar
-            if cookie.domain == "api.vrchat.cloud"
-        }
-        with open(cookie_file, 'w') as f:
-            json.dump(cookies, f)
-        return True
-    except Exception as e:
-        print(f"[!] Error saving cookies: {str(e)}")
-        return False
-
-def login():
-    while True:
-        try:
-            print("\nVRChat Login")
-            print("============")
-            username = input("Enter your VRChat username/email: ")
-            password = input("Enter your VRChat password: ")
-
-            configuration = vrchatapi.Configuration(
-                username=username,
-                password=password
-            )
-
-            api_client = vrchatapi.ApiClient(configuration)
-            api_client.user_agent = "VRChatBlockManager/1.0.0"
-            
-            # Try loading cookies first
-            if load_cookies(api_client):
-                print("\n[✓] Loaded saved cookies - attempting session reuse")
-            
-            auth_api = authentication_api.AuthenticationApi(api_client)
-            users_api_instance = users_api.UsersApi(api_client)
+# Modules shared with the avatar info tool live in shared/ at the top of the repository
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'shared'))
 
-            try:
-                current_user = auth_api.get_current_user()
-                print(f"\nLogged in as: {current_user.display_name}")
-                save_cookies(api_client)
-                return api_client, auth_api, users_api_instance
-
-            except UnauthorizedException as e:
-                if "2 Factor Authentication" in str(e) or "Email 2 Factor Authentication" in str(e):
-                    code = input("2FA Code: ")
-                    if "Email" in str(e):
-                        auth_api.verify2_fa_email_code(two_factor_email_code=TwoFactorEmailCode(code))
-                    else:
-                        auth_api.verify2_fa(two_factor_auth_code=TwoFactorAuthCode(code))
-                    current_user = auth_api.get_current_user()
-                    print(f"\nLogged in as: {current_user.display_name}")
-                    save_cookies(api_client)
-                    return api_client, auth_api, users_api_instance
-                else:
-                    print(f"\nError: {str(e)}")
-
-        except ApiException as e:
-            print(f"\nError during login: {str(e)}")
-            
-        retry = input("\nWould you like to try again? (y/n): ")
-        if retry.lower() != 'y':
-            sys.exit(1)
-
-def read_user_ids():
-    """Read user IDs from the file"""
-    try:
-        with open('usrids.txt', 'r') as f:
-            return [line.strip() for line in f.readlines() if line.strip()]
-    except FileNotFoundError:
-        print("\n[!] usrids.txt not found. Creating new file.")
-        with open('usrids.txt', 'w') as f:
-            pass
-        return []
-
-def add_user_id(user_id):
-    """Add a user ID to the file if not already present"""
-    user_ids = read_user_ids()
-    if user_id not in user_ids:
-        with open('usrids.txt', 'a') as f:
-            f.write(f"{user_id}\n")
+import vrchatapi
+import atexit
+from vrchatapi.api import authentication_api, users_api
+from vrchatapi.exceptions import ApiException
+from block_list_cache import BlockListSnapshot
+from metrics import MetricsExporter
+from moderation_executor import ModerationExecutor, read_failures
+from rate_limiter import AdaptiveRateLimiter
+from user_id_store import UserIdStore
+from vrchat_session import start_session
+
+# Paces every VRChat API call per endpoint family and retries on HTTP 429.
+# avatar_privacy_manager.py logs in through this module and shares it.
+rate_limiter = AdaptiveRateLimiter(default_rate=1.0, burst=3)
+
+# Bulk block/unblock requests in flight at once; the rate limiter still sets the pace
+BULK_WORKERS = 4
+FAILURES_FILE = 'failed_moderations.txt'
+
+# How long the local copy of the block list is trusted before it is fetched again
+BLOCK_LIST_TTL = 3600
+PAGE_SIZE = 50
+
+def login(interactive=None):
+    """Start a VRChat session, reusing the shared saved session before asking for credentials"""
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    api_client, _ = start_session(
+        "VRChatBlockManager/1.0.0",
+        secrets_file=os.path.join(base_dir, 'vrchat_secrets.json'),
+        legacy_cookie_file=os.path.join(base_dir, 'vrchat_cookies.json'),
+        rate_limiter=rate_limiter,
+        interactive=interactive
+    )
+    auth_api = authentication_api.AuthenticationApi(api_client)
+    users_api_instance = users_api.UsersApi(api_client)
+    return api_client, auth_api, users_api_instance
+
+def plan_block_sync(file_ids, blocked):
+    """Compare usrids.txt against the live block list
+
+    Returns:
+        tuple: (to_block, to_unblock, not_in_file) - file IDs that are not
+        blocked yet, file IDs that are blocked, and blocked users missing
+        from the file
+    """
+    file_set = set(file_ids)
+    to_block = [user_id for user_id in file_ids if user_id not in blocked]
+    to_unblock = [user_id for user_id in file_ids if user_id in blocked]
+    not_in_file = [user_id for user_id in blocked if user_id not in file_set]
+    return to_block, to_unblock, not_in_file
+
+def run_moderations(moderation_api, snapshot, items):
+    """Run (action, user_id) items concurrently, returns the failures"""
+    executor = ModerationExecutor(moderation_api, workers=BULK_WORKERS, failures_file=FAILURES_FILE)
+    failed = executor.run(items)
+    done = [item for item in items if item not in failed]
+    snapshot.mark_blocked([user_id for action, user_id in done if action == 'block'])
+    snapshot.mark_unblocked([user_id for action, user_id in done if action == 'unblock'])
+    return failed
+
+def run_bulk(moderation_api, snapshot, action, user_ids):
+    """Block or unblock many users concurrently, returns the failures"""
+    print(f"\n{action.capitalize()}ing {len(user_ids)} users with {BULK_WORKERS} workers...")
+    print("Requests are paced automatically and retried if VRChat rate limits us...")
+    return run_moderations(moderation_api, snapshot, [(action, user_id) for user_id in user_ids])
+
+def start_metrics():
+    """Export this run's metrics, the JSON summary is written next to the script on exit"""
+    exporter = MetricsExporter.from_config({}, os.path.dirname(os.path.abspath(__file__)))
+    atexit.register(exporter.close)
+    return exporter
 
 def main():
+    start_metrics()
     api_client, auth_api, users_api = login()
     moderation_api = vrchatapi.api.playermoderation_api.PlayermoderationApi(api_client)
+    # usrids.txt is read once; every change is appended and the file is tidied up on exit
+    user_store = UserIdStore('usrids.txt')
+    atexit.register(user_store.close)
+    # The block list is fetched at most once per BLOCK_LIST_TTL and kept current locally;
+    # bulk changes and syncing fetch it once per run so in-game blocks aren't missed
+    snapshot = BlockListSnapshot(moderation_api, 'block_list_cache.json', ttl=BLOCK_LIST_TTL)
 
     while True:
         print("\nVRChat User Block Manager")
@@ -147,18 +96,22 @@ def main():
         print("4. Block All Users from File")
         print("5. Unblock All Users from File")
         print("6. List Users in File")
-        print("7. Exit")
+        print("7. Sync Block List with File")
+        print("8. Retry Failed Operations")
+        print("9. Exit")
         
-        choice = input("\nEnter your choice (1-7): ")
+        choice = input("\nEnter your choice (1-9): ")
         
         if choice == "1":
             user_id = input("Enter the UserID to block: ")
             try:
                 moderation_request = {"moderated": user_id, "type": "block"}
-                moderation_api.moderate_user(moderation_request)
+                moderation = moderation_api.moderate_user(moderation_request)
                 print(f"\n[✓] Successfully blocked user: {user_id}")
-                add_user_id(user_id)
-                print("[✓] Added user ID to file")
+                display_name = getattr(moderation, 'target_display_name', None)
+                snapshot.mark_blocked([user_id], {user_id: display_name})
+                if user_store.add(user_id, display_name=display_name):
+                    print("[✓] Added user ID to file")
             except ApiException as e:
                 print(f"\n[!] Error blocking user: {str(e)}")
 
@@ -167,75 +120,120 @@ def main():
             try:
                 moderation_request = {"moderated": user_id, "type": "block"}
                 moderation_api.unmoderate_user(moderation_request)
+                snapshot.mark_unblocked([user_id])
                 print(f"\n[✓] Successfully unblocked user: {user_id}")
             except ApiException as e:
                 print(f"\n[!] Error unblocking user: {str(e)}")
 
         elif choice == "3":
+            search = input("Filter by name or ID (Enter for all, 'r' to refresh the list first): ").strip()
             try:
-                moderations = moderation_api.get_player_moderations(type="block")
-                if moderations:
-                    print("\nBlocked Users:")
-                    print("==============")
-                    for mod in moderations:
-                        print(f"{mod.target_display_name} ({mod.target_user_id})")
+                if search.lower() == 'r':
+                    snapshot.refresh(force=True)
+                    search = ""
+                shown = 0
+                for page in snapshot.pages(PAGE_SIZE, search or None):
+                    if not shown:
+                        print("\nBlocked Users:")
+                        print("==============")
+                    for entry in page:
+                        print(f"{entry['display_name']} ({entry['user_id']})")
+                    shown += len(page)
+                    if len(page) == PAGE_SIZE and input(f"-- {shown} shown, Enter for more or 'q' to stop -- ").lower() == 'q':
+                        break
+                if not shown:
+                    print("\nNo blocked users match." if search else "\nNo users are currently blocked.")
                 else:
-                    print("\nNo users are currently blocked.")
+                    print(f"\n(Block list fetched {int(snapshot.age // 60)} min ago)")
             except ApiException as e:
                 print(f"\n[!] Error fetching blocked users: {str(e)}")
 
         elif choice == "4":
-            user_ids = read_user_ids()
+            user_ids = list(user_store)
             if not user_ids:
                 print("\n[!] No user IDs found in file")
                 continue
+            try:
+                blocked = snapshot.live_blocked()
+            except ApiException as e:
+                print(f"\n[!] Error fetching blocked users: {str(e)}")
+                continue
                 
-            print(f"\nFound {len(user_ids)} users to block")
-            print("Processing with 1 second delay between users...")
-            
-            for user_id in user_ids:
-                try:
-                    moderation_request = {"moderated": user_id, "type": "block"}
-                    moderation_api.moderate_user(moderation_request)
-                    print(f"[✓] Blocked {user_id}")
-                    time.sleep(1)  # 1 second delay
-                except ApiException as e:
-                    print(f"[!] Error blocking {user_id}: {str(e)}")
+            to_block, _, _ = plan_block_sync(user_ids, blocked)
+            print(f"\nFound {len(user_ids)} users in file, {len(user_ids) - len(to_block)} already blocked")
+            if not to_block:
+                print("[✓] Nothing to do")
+                continue
+            run_bulk(moderation_api, snapshot, 'block', to_block)
 
         elif choice == "5":
-            user_ids = read_user_ids()
+            user_ids = list(user_store)
             if not user_ids:
                 print("\n[!] No user IDs found in file")
                 continue
+            try:
+                blocked = snapshot.live_blocked()
+            except ApiException as e:
+                print(f"\n[!] Error fetching blocked users: {str(e)}")
+                continue
                 
-            print(f"\nFound {len(user_ids)} users to unblock")
-            print("Processing with 1 second delay between users...")
-            
-            for user_id in user_ids:
-                try:
-                    moderation_request = {"moderated": user_id, "type": "block"}
-                    moderation_api.unmoderate_user(moderation_request)
-                    print(f"[✓] Unblocked {user_id}")
-                    time.sleep(1)  # 1 second delay
-                except ApiException as e:
-                    print(f"[!] Error unblocking {user_id}: {str(e)}")
+            _, to_unblock, _ = plan_block_sync(user_ids, blocked)
+            print(f"\nFound {len(user_ids)} users in file, {len(user_ids) - len(to_unblock)} not blocked")
+            if not to_unblock:
+                print("[✓] Nothing to do")
+                continue
+            run_bulk(moderation_api, snapshot, 'unblock', to_unblock)
 
         elif choice == "6":
-            user_ids = read_user_ids()
-            if user_ids:
+            if len(user_store):
                 print("\nUsers in File:")
                 print("=============")
-                for user_id in user_ids:
-                    print(user_id)
+                for user_id in user_store:
+                    metadata = user_store.get(user_id)
+                    details = ", ".join(metadata[field] for field in ('display_name', 'blocked_at', 'reason') if metadata.get(field))
+                    print(f"{user_id} ({details})" if details else user_id)
             else:
                 print("\nNo users found in file")
 
         elif choice == "7":
+            user_ids = list(user_store)
+            try:
+                blocked = snapshot.live_blocked()
+            except ApiException as e:
+                print(f"\n[!] Error fetching blocked users: {str(e)}")
+                continue
+                
+            to_block, _, not_in_file = plan_block_sync(user_ids, blocked)
+            print(f"\n{len(user_ids)} users in file, {len(blocked)} blocked on VRChat")
+            print(f"  {len(to_block)} in file but not blocked")
+            print(f"  {len(not_in_file)} blocked but not in file")
+            if to_block:
+                run_bulk(moderation_api, snapshot, 'block', to_block)
+            if not_in_file:
+                action = input("\nBlocked users missing from the file: (a)dd them to the file, (u)nblock them or (s)kip? ")
+                if action.lower() == 'a':
+                    added = user_store.add_many({user_id: blocked[user_id] for user_id in not_in_file})
+                    print(f"[✓] Added {added} user IDs to file")
+                elif action.lower() == 'u':
+                    run_bulk(moderation_api, snapshot, 'unblock', not_in_file)
+            if not to_block and not not_in_file:
+                print("[✓] Block list and file are already in sync")
+
+        elif choice == "8":
+            failures = read_failures(FAILURES_FILE)
+            if not failures:
+                print("\n[✓] No failed operations to retry")
+                continue
+            print(f"\nRetrying {len(failures)} failed operations from {FAILURES_FILE}...")
+            run_moderations(moderation_api, snapshot, failures)
+
+        elif choice == "9":
+            user_store.close()
             print("\nGoodbye!")
             break
 
         else:
-            print("\n[!] Invalid choice. Please enter a number between 1-7.")
+            print("\n[!] Invalid choice. Please enter a number between 1-9.")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,166 @@
+import heapq
+import os
+import random
+import sys
+import time
+
+from vrchatapi.exceptions import ApiException
+
+import metrics
+from api_executor import ApiExecutor
+
+ACTIONS = ('block', 'unblock')
+
+
+def is_retryable(error):
+    """Network errors, throttling and server errors are worth another try, other API errors are not"""
+    if isinstance(error, ApiException):
+        return error.status is None or error.status == 429 or error.status >= 500
+    return True
+
+
+def describe_error(error):
+    """One line summary of an exception"""
+    text = " ".join(str(error).split())
+    return text[:200] if text else type(error).__name__
+
+
+def format_duration(seconds):
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+def read_failures(path):
+    """Read a failures file back as [(action, user_id)]"""
+    if not os.path.exists(path):
+        return []
+    items = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            parts = line.rstrip('\n').split('\t')
+            if len(parts) >= 2 and parts[0] in ACTIONS:
+                items.append((parts[0], parts[1]))
+    return items
+
+
+class ModerationExecutor:
+    """Blocks or unblocks many users with a bounded number of requests in flight
+
+    The requests run on the API client's thread pool (api_executor.py).
+    Pacing and HTTP 429 handling come from the rate limiter installed on the
+    API client, so they go exactly as fast as VRChat allows. On top of that
+    every user gets up to max_attempts tries with exponential backoff for
+    network and server errors; a user waiting for a retry doesn't hold up
+    the others. Users that still fail are written to
+    failures_file (tab separated action, user ID and error) so they can be
+    retried later, and a progress line with an ETA is kept up to date.
+
+    Args:
+        moderation_api (PlayermoderationApi): API used for the requests
+        workers (int): Requests in flight at the same time
+        max_attempts (int): Tries per user before giving up
+        base_backoff (float): Seconds before the first retry, doubled each time
+        failures_file (str): Where failed items are recorded
+    """
+
+    def __init__(self, moderation_api, workers=4, max_attempts=3, base_backoff=2.0,
+                 failures_file='failed_moderations.txt'):
+        self.moderation_api = moderation_api
+        self.workers = max(1, workers)
+        self.max_attempts = max(1, max_attempts)
+        self.base_backoff = base_backoff
+        self.failures_file = failures_file
+
+    def _submit(self, executor, item, attempt):
+        action, user_id = item
+        moderation_request = {"moderated": user_id, "type": "block"}
+        if action == 'block':
+            method = self.moderation_api.moderate_user
+        else:
+            method = self.moderation_api.unmoderate_user
+        executor.submit(method, moderation_request, tag=(item, attempt))
+
+    def _backoff(self, attempt):
+        return self.base_backoff * (2 ** (attempt - 1)) * random.uniform(0.8, 1.2)
+
+    def run(self, items):
+        """Run [(action, user_id)] items, returns {(action, user_id): error} for the ones that failed"""
+        total = len(items)
+        failed = {}
+        done = 0
+        started = time.monotonic()
+
+        def show_progress():
+            elapsed = time.monotonic() - started
+            rate = done / elapsed if elapsed > 0 else 0
+            eta = format_duration((total - done) / rate) if rate else "?"
+            sys.stdout.write(f"\r[{done}/{total}] {len(failed)} failed, {rate:.1f}/s, ETA {eta}   ")
+            sys.stdout.flush()
+
+        executor = ApiExecutor(self.moderation_api.api_client, self.workers)
+        queue = iter(items)
+        retries = []  # heap of (due time, item, attempt)
+        try:
+            while True:
+                # Keep a bounded number of requests queued behind the pool,
+                # retries that are due first
+                while executor.pending < self.workers * 2:
+                    if retries and retries[0][0] <= time.monotonic():
+                        _, item, attempt = heapq.heappop(retries)
+                        self._submit(executor, item, attempt)
+                        continue
+                    item = next(queue, None)
+                    if item is None:
+                        break
+                    self._submit(executor, item, 1)
+                if not executor.pending:
+                    if not retries:
+                        break
+                    metrics.sleep(max(0.0, retries[0][0] - time.monotonic()), 'retry_backoff')
+                    continue
+
+                # With room left, wake up in time to send the next retry
+                timeout = None
+                if retries and executor.pending < self.workers * 2:
+                    timeout = max(0.0, retries[0][0] - time.monotonic())
+                call = executor.next_completed(timeout)
+                if call is None:
+                    continue
+                item, attempt = call.tag
+                try:
+                    call.result()
+                except Exception as e:
+                    if attempt < self.max_attempts and is_retryable(e):
+                        reason = str(e.status) if isinstance(e, ApiException) and e.status else 'network'
+                        metrics.inc('retries_total', service='vrchat', reason=reason)
+                        heapq.heappush(retries, (time.monotonic() + self._backoff(attempt), item, attempt + 1))
+                        continue
+                    failed[item] = e
+                    message = f"[!] Error {item[0]}ing {item[1]}: {describe_error(e)}"
+                    sys.stdout.write(f"\r{message.ljust(60)}\n")
+                done += 1
+                show_progress()
+        finally:
+            executor.close()
+        print()
+
+        self.save_failures(failed)
+        elapsed = time.monotonic() - started
+        print(f"[✓] {total - len(failed)} of {total} done in {format_duration(elapsed)}")
+        if failed:
+            print(f"[!] {len(failed)} failed - saved to {self.failures_file} for a retry")
+        return failed
+
+    def save_failures(self, failed):
+        """Replace the failures file with the items that failed in the last run"""
+        if not failed:
+            if os.path.exists(self.failures_file):
+                os.remove(self.failures_file)
+            return
+        with open(self.failures_file, 'w', encoding='utf-8') as f:
+            for (action, user_id), error in failed.items():
+                f.write(f"{action}\t{user_id}\t{describe_error(error)}\n")
@@ -0,0 +1,144 @@
+import os
+import threading
+from datetime import datetime, timezone
+
+FIELDS = ('blocked_at', 'reason', 'display_name')
+
+
+class UserIdStore:
+    """Indexed view of usrids.txt
+
+    The file is read once into an ordered dict, so add/contains/remove are
+    O(1) and nothing is re-read while the menu runs. Changes are appended:
+    an added user is one line, a removed user is a '-<user_id>' line.
+    Duplicates and removals are folded away by compact(), which rewrites
+    the file atomically (keeping '#' comments at the top) and runs on close
+    when there is anything to fold.
+
+    Lines stay compatible with a hand-written list: a bare user ID per line
+    works, optionally followed by tab separated metadata
+    (blocked_at, reason, display_name). Blank lines and '#' comments are
+    ignored.
+
+    Args:
+        path (str): User ID list
+    """
+
+    def __init__(self, path='usrids.txt'):
+        self.path = path
+        self._users = {}  # user_id -> {'blocked_at': ..., 'reason': ..., 'display_name': ...}
+        self._stale_lines = 0  # Duplicate and removal lines compact() would drop
+        self._comments = []
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            print(f"\n[!] {self.path} not found. Creating new file.")
+            open(self.path, 'w').close()
+            return
+        with open(self.path, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                line = line.rstrip('\r\n')
+                if line.startswith('#'):
+                    self._comments.append(line)
+                    continue
+                if not line.strip():
+                    continue
+                if line.startswith('-'):
+                    self._users.pop(line[1:].strip(), None)
+                    self._stale_lines += 2  # The removal and the line it cancels
+                    continue
+                user_id, *values = [part.strip() for part in line.split('\t')]
+                metadata = {field: value for field, value in zip(FIELDS, values) if value}
+                if user_id in self._users:
+                    self._users[user_id].update(metadata)
+                    self._stale_lines += 1
+                else:
+                    self._users[user_id] = metadata
+
+    def __contains__(self, user_id):
+        return user_id in self._users
+
+    def __len__(self):
+        return len(self._users)
+
+    def __iter__(self):
+        return iter(list(self._users))
+
+    def get(self, user_id):
+        """Return the metadata stored for a user, or None if not in the list"""
+        metadata = self._users.get(user_id)
+        return dict(metadata) if metadata is not None else None
+
+    def add(self, user_id, display_name=None, reason=None, blocked_at=None):
+        """Add a user, returns False if it was already in the list"""
+        with self._lock:
+            if user_id in self._users:
+                return False
+            metadata = {
+                'blocked_at': blocked_at or datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                'reason': reason,
+                'display_name': display_name,
+            }
+            self._users[user_id] = {field: value for field, value in metadata.items() if value}
+            self._append([self._format(user_id)])
+            return True
+
+    def add_many(self, users):
+        """Add {user_id: display_name} (or an iterable of IDs) with a single append"""
+        if not isinstance(users, dict):
+            users = dict.fromkeys(users)
+        blocked_at = datetime.now(timezone.utc).isoformat(timespec='seconds')
+        with self._lock:
+            lines = []
+            for user_id, display_name in users.items():
+                if user_id in self._users:
+                    continue
+                self._users[user_id] = {'blocked_at': blocked_at}
+                if display_name:
+                    self._users[user_id]['display_name'] = display_name
+                lines.append(self._format(user_id))
+            self._append(lines)
+            return len(lines)
+
+    def remove(self, user_id):
+        """Remove a user, returns False if it wasn't in the list"""
+        with self._lock:
+            if self._users.pop(user_id, None) is None:
+                return False
+            self._stale_lines += 2
+            self._append([f"-{user_id}"])
+            return True
+
+    def _format(self, user_id):
+        metadata = self._users[user_id]
+        values = [" ".join(str(metadata.get(field) or '').split()) for field in FIELDS]
+        while values and not values[-1]:
+            values.pop()
+        return "\t".join([user_id] + values)
+
+    def _append(self, lines):
+        if lines:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write("".join(f"{line}\n" for line in lines))
+
+    def compact(self):
+        """Rewrite the file without duplicates and removed users"""
+        with self._lock:
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write("".join(f"{comment}\n" for comment in self._comments))
+                f.write("".join(f"{self._format(user_id)}\n" for user_id in self._users))
+            os.replace(tmp_path, self.path)
+            self._stale_lines = 0
+
+    def close(self):
+        if self._stale_lines:
+            self.compact()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,312 @@
+"""Offline benchmarks for the avatar fetcher, block manager and privacy manager
+
+Starts the stand-in servers from mock_servers.py (or uses ones already
+running), points the real tool code at them and reports, per scenario:
+
+    throughput   operations per second over the whole run
+    p50 / p99    latency of each VRChat request as the tool sees it
+                 (rate limiter waits and 429 retries included) and of each
+                 Discord webhook post
+    peak memory  highest Python heap use during the run (tracemalloc)
+
+Scenarios:
+    avatar_info  the avatar_info.py fetch loop over an ID file, with caches,
+                 journal, result log and two Discord webhooks
+    block        block_manager.py "Sync Block List with File": load the file,
+                 fetch the block list, bulk block the missing users
+    unblock      block_manager.py bulk unblock of the same users
+    privacy      avatar_privacy_manager.py: list every owned avatar, then
+                 make all of them private and public again
+
+Example:
+    python benchmarks/bench.py --count 1000 --vrchat-latency-ms 40 --vrchat-throttle-rate 0.01
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+import requests
+import vrchatapi
+from requests.adapters import HTTPAdapter
+from vrchatapi.api import avatars_api, playermoderation_api
+
+import mock_servers
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+AVATAR_DIR = os.path.join(REPO_DIR, "vrchat api avatar work one", "Python scripts")
+BLOCK_DIR = os.path.join(REPO_DIR, "Private avatar tool to unprivate avatars and block users")
+SHARED_DIR = os.path.join(REPO_DIR, "shared")
+sys.path[:0] = [AVATAR_DIR, BLOCK_DIR, SHARED_DIR]
+
+import avatar_info
+import avatar_privacy_manager
+import block_manager
+import metrics
+from avatar_cache import AvatarCache, NegativeCache
+from avatar_id_reader import AvatarIdReader
+from block_list_cache import BlockListSnapshot
+from discord_dispatcher import DiscordDispatcher
+from http_session import PooledSession
+from processed_store import ProcessedStore
+from rate_limiter import AdaptiveRateLimiter
+from result_sink import ResultSink
+from run_journal import RunJournal
+from user_id_store import UserIdStore
+
+SCENARIOS = ('avatar_info', 'block', 'unblock', 'privacy')
+WEBHOOK_URLS = [
+    "https://discord.com/api/webhooks/100000000000000001/" + "a" * 68,
+    "https://discord.com/api/webhooks/100000000000000002/" + "b" * 68,
+]
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class LatencyRecorder:
+    """Collects the duration of every call made through a wrapped function"""
+
+    def __init__(self):
+        self.durations = []
+        self._lock = threading.Lock()
+
+    def wrap(self, func):
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - started
+                with self._lock:
+                    self.durations.append(elapsed)
+        return timed
+
+    def summary(self):
+        return {
+            'requests': len(self.durations),
+            'p50_ms': round(percentile(self.durations, 0.50) * 1000, 2),
+            'p99_ms': round(percentile(self.durations, 0.99) * 1000, 2),
+        }
+
+
+class RedirectAdapter(HTTPAdapter):
+    """Sends requests for one base URL to another (Discord -> local stand-in)"""
+
+    def __init__(self, source, target, **kwargs):
+        super().__init__(**kwargs)
+        self.source = source
+        self.target = target
+
+    def send(self, request, **kwargs):
+        request.url = self.target + request.url[len(self.source):]
+        return super().send(request, **kwargs)
+
+
+class Bench:
+    """Per scenario client on the VRChat stand-in, with latency recording on both services"""
+
+    def __init__(self, args, vrchat_url, discord_url):
+        self.args = args
+        self.vrchat_url = vrchat_url
+        self.discord_url = discord_url
+        self.vrchat = LatencyRecorder()
+        self.discord = LatencyRecorder()
+        self.rate_limiter = AdaptiveRateLimiter(default_rate=args.rate, burst=args.burst)
+        self.api_client = vrchatapi.ApiClient(vrchatapi.Configuration(host=vrchat_url))
+        self.api_client.user_agent = "VRChatToolsBenchmark/1.0.0"
+        # Same layering as start_session(): metrics innermost, then the rate limiter
+        metrics.instrument_api_client(self.api_client)
+        self.rate_limiter.install(self.api_client)
+        self.api_client.request = self.vrchat.wrap(self.api_client.request)
+
+    def discord_session(self):
+        session = PooledSession(pool_size=len(WEBHOOK_URLS))
+        session.session.mount('https://discord.com/', RedirectAdapter(
+            'https://discord.com', self.discord_url, pool_maxsize=len(WEBHOOK_URLS)
+        ))
+        session.post = self.discord.wrap(session.post)
+        return session
+
+
+def bench_avatar_info(bench, workdir):
+    args = bench.args
+    ids_file = os.path.join(workdir, 'avatar_ids.txt')
+    with open(ids_file, 'w') as f:
+        for i in range(args.count):
+            f.write(mock_servers.bench_avatar_id(1000000 + i) + "\n")
+
+    # The processed log normally lives next to avatar_info.py
+    avatar_info._processed_store = ProcessedStore(os.path.join(workdir, 'discord_avatar_check.txt'))
+    dispatcher = DiscordDispatcher(WEBHOOK_URLS, batch_size=args.discord_batch, batch_interval=0.5,
+                                   session=bench.discord_session())
+    runtime = avatar_info.Runtime(
+        avatars_api.AvatarsApi(bench.api_client),
+        args.workers,
+        dispatcher,
+        AvatarCache(os.path.join(workdir, 'avatar_cache.db')),
+        NegativeCache(os.path.join(workdir, 'avatar_negative_cache.db')),
+        RunJournal(os.path.join(workdir, 'run_journal.jsonl'), truncate=True),
+        ResultSink(os.path.join(workdir, 'api_log.jsonl')),
+    )
+    avatar_info.process_avatar_ids(runtime, AvatarIdReader(ids_file), ids_file)
+    runtime.close()
+    avatar_info._processed_store.close()
+    return args.count
+
+
+def bench_block(bench, workdir, action='block'):
+    args = bench.args
+    block_manager.BULK_WORKERS = args.workers
+    moderation_api = playermoderation_api.PlayermoderationApi(bench.api_client)
+    with open('usrids.txt', 'w') as f:
+        for i in range(args.count):
+            f.write(mock_servers.bench_user_id(1000000 + i) + "\n")
+    user_store = UserIdStore('usrids.txt')
+    snapshot = BlockListSnapshot(moderation_api, 'block_list_cache.json')
+    to_block, to_unblock, _ = block_manager.plan_block_sync(list(user_store), snapshot.blocked())
+    if action == 'block':
+        user_ids = to_block
+    else:
+        # Run on its own the users aren't blocked yet; VRChat accepts the unblocks anyway
+        user_ids = to_unblock or list(user_store)
+    block_manager.run_bulk(moderation_api, snapshot, action, user_ids)
+    user_store.close()
+    return len(user_ids)
+
+
+def bench_unblock(bench, workdir):
+    return bench_block(bench, workdir, action='unblock')
+
+
+def bench_privacy(bench, workdir):
+    avatar_privacy_manager.login = lambda: (bench.api_client, None, None)
+    manager = avatar_privacy_manager.AvatarPrivacyManager()
+    # get_current_user needs the full CurrentUser model, which the stand-in doesn't serve
+    manager._user_id = mock_servers.OWNER_ID
+    avatars = manager.get_my_avatars()
+    updated, _, _ = manager.bulk_set_privacy(avatars, True, workers=bench.args.workers)
+    avatars = manager.get_my_avatars()
+    updated_back, _, _ = manager.bulk_set_privacy(avatars, False, workers=bench.args.workers)
+    return len(updated) + len(updated_back)
+
+
+def run_scenario(name, args, vrchat_url, discord_url):
+    bench = Bench(args, vrchat_url, discord_url)
+    scenario = globals()[f'bench_{name}']
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix=f'bench-{name}-') as workdir:
+        os.chdir(workdir)
+        output = sys.stdout if args.verbose else open(os.devnull, 'w', encoding='utf-8')
+        tracemalloc.start()
+        started = time.perf_counter()
+        try:
+            with contextlib.redirect_stdout(output):
+                operations = scenario(bench, workdir)
+            elapsed = time.perf_counter() - started
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+            os.chdir(cwd)
+            if output is not sys.stdout:
+                output.close()
+    return {
+        'scenario': name,
+        'operations': operations,
+        'seconds': round(elapsed, 3),
+        'ops_per_second': round(operations / elapsed, 2) if elapsed else 0.0,
+        'vrchat': bench.vrchat.summary(),
+        'discord': bench.discord.summary(),
+        'peak_memory_mb': round(peak / (1024 * 1024), 2),
+    }
+
+
+def print_results(results):
+    print(f"\n{'scenario':<12} {'ops':>6} {'ops/s':>9} {'vrchat p50':>11} {'p99':>9} "
+          f"{'discord p50':>12} {'p99':>9} {'peak MB':>8}")
+    for result in results:
+        vrchat, discord = result['vrchat'], result['discord']
+        discord_columns = (f"{discord['p50_ms']:>10.1f}ms {discord['p99_ms']:>7.1f}ms"
+                           if discord['requests'] else f"{'-':>12} {'-':>9}")
+        print(f"{result['scenario']:<12} {result['operations']:>6} {result['ops_per_second']:>9.1f} "
+              f"{vrchat['p50_ms']:>9.1f}ms {vrchat['p99_ms']:>7.1f}ms {discord_columns} "
+              f"{result['peak_memory_mb']:>8.1f}")
+
+
+def fetch_stats(url):
+    try:
+        return requests.get(f"{url}/_stats", timeout=5).json()
+    except (requests.RequestException, ValueError):
+        return {}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the tools against local VRChat and Discord stand-ins")
+    parser.add_argument('scenarios', nargs='*', metavar='scenario',
+                        help=f"any of {', '.join(SCENARIOS)} (default: all)")
+    parser.add_argument('--count', type=int, default=500,
+                        help="avatar IDs / users per scenario, privacy uses --owned-avatars (default: 500)")
+    parser.add_argument('--workers', type=int, default=4,
+                        help="worker threads in the tools (default: 4)")
+    parser.add_argument('--rate', type=float, default=1000.0,
+                        help="client side requests per second per endpoint family (default: 1000)")
+    parser.add_argument('--burst', type=int, default=20,
+                        help="client side rate limiter burst (default: 20)")
+    parser.add_argument('--discord-batch', type=int, default=10,
+                        help="embeds per Discord message (default: 10)")
+    parser.add_argument('--vrchat-url', help="use an already running VRChat stand-in, e.g. http://127.0.0.1:8700/api/1")
+    parser.add_argument('--discord-url', help="use an already running Discord stand-in, e.g. http://127.0.0.1:8701")
+    parser.add_argument('--json', metavar='FILE', help="also write the results to a JSON file")
+    parser.add_argument('--verbose', action='store_true', help="show the tools' own output")
+    mock_servers.add_server_args(parser)
+    args = parser.parse_args()
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario {', '.join(unknown)} (choose from {', '.join(SCENARIOS)})")
+    args.scenarios = args.scenarios or list(SCENARIOS)
+    return args
+
+
+def main():
+    args = parse_args()
+    servers = []
+    vrchat_url, discord_url = args.vrchat_url, args.discord_url
+    if not vrchat_url or not discord_url:
+        servers = mock_servers.start_servers(args)
+        vrchat_url = vrchat_url or servers[0].api_url
+        discord_url = discord_url or servers[1].url
+    print(f"VRChat stand-in: {vrchat_url}")
+    print(f"Discord stand-in: {discord_url}")
+
+    results = []
+    for name in args.scenarios:
+        print(f"\nRunning {name} ({args.count} items, {args.workers} workers)...")
+        results.append(run_scenario(name, args, vrchat_url, discord_url))
+    print_results(results)
+
+    stats = {
+        'vrchat': fetch_stats(vrchat_url.rsplit('/api/', 1)[0]),
+        'discord': fetch_stats(discord_url),
+    }
+    print(f"\nVRChat stand-in requests: {stats['vrchat']}")
+    print(f"Discord stand-in requests: {stats['discord']}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'settings': vars(args), 'results': results, 'server_requests': stats}, f, indent=2)
+        print(f"\n[✓] Results written to {args.json}")
+
+    for server in servers:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,487 @@
+"""Local stand-ins for the VRChat API and Discord webhooks
+
+Serves the endpoints the tools use with realistic payloads, so they can be
+load-tested without touching the real services:
+
+    GET  /api/1/avatars/<id>                  get_avatar
+    GET  /api/1/avatars?userId=...            search_avatars
+    PUT  /api/1/avatars/<id>                  update_avatar
+    GET  /api/1/auth/user/playermoderations   get_player_moderations
+    POST /api/1/auth/user/playermoderations   moderate_user
+    PUT  /api/1/auth/user/unplayermoderate    unmoderate_user
+    POST /api/webhooks/<id>/<token>           Discord webhook (second port)
+    GET  /_stats                              request counts (both ports)
+
+Every response can be delayed, failed with a server error or throttled with
+a 429, at rates set on the command line. Run it standalone and point a
+client at the printed URLs, or let bench.py start it.
+"""
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+OWNER_ID = 'usr_00000000-0000-4000-8000-00000000bead'
+OWNER_NAME = 'Bench Owner'
+
+AVATAR_PATH = re.compile(r'^/api/1/avatars/(avtr_[0-9a-fA-F-]{36})$')
+AVATARS_PATH = re.compile(r'^/api/1/avatars$')
+MODERATIONS_PATH = re.compile(r'^/api/1/auth/user/playermoderations$')
+UNMODERATE_PATH = re.compile(r'^/api/1/auth/user/unplayermoderate$')
+WEBHOOK_PATH = re.compile(r'^/api/webhooks/(\d+)/([\w-]+)$')
+
+
+def stable_fraction(text):
+    """Deterministic number in [0, 1) for a string, so an ID always gets the same outcome"""
+    return int(hashlib.md5(text.encode('utf-8')).hexdigest()[:8], 16) / 0x100000000
+
+
+def timestamp(seconds_ago=0):
+    moment = datetime.now(timezone.utc) - timedelta(seconds=seconds_ago)
+    return moment.isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+
+
+def avatar_payload(avatar_id, author_id=None, author_name=None, release_status=None, index=None):
+    """Avatar JSON shaped like VRChat's, with every field the client requires"""
+    fraction = stable_fraction(avatar_id)
+    index = index if index is not None else int(fraction * 100000)
+    file_id = f"file_{avatar_id[5:]}"
+    unity_package_url = f"https://api.vrchat.cloud/api/1/file/{file_id}/1/file"
+    packages = [{
+        'id': f"unp_{avatar_id[5:]}",
+        'assetUrl': unity_package_url,
+        'assetVersion': 1,
+        'created_at': timestamp(86400),
+        'platform': 'standalonewindows',
+        'unityVersion': '2022.3.22f1',
+        'variant': 'standard',
+    }]
+    if fraction < 0.6:
+        packages.append(dict(packages[0], id=f"unp_q{avatar_id[6:]}", platform='android'))
+    return {
+        'authorId': author_id or f"usr_{avatar_id[5:]}",
+        'authorName': author_name or f"Creator {index % 977}",
+        'created_at': timestamp(86400 * 30),
+        'description': f"Benchmark avatar number {index}. " * 3,
+        'featured': False,
+        'id': avatar_id,
+        'imageUrl': f"https://api.vrchat.cloud/api/1/file/{file_id}/1/file",
+        'name': f"Avatar {index}",
+        'performance': {'standalonewindows': 'Good', 'android': 'Medium'},
+        'releaseStatus': release_status or ('public' if fraction < 0.8 else 'private'),
+        'searchable': True,
+        'styles': {'primary': None, 'secondary': None, 'supplementary': []},
+        'tags': ['content_sex', 'author_tag_bench'] if fraction < 0.1 else [],
+        'thumbnailImageUrl': f"https://api.vrchat.cloud/api/1/image/{file_id}/1/256",
+        'unityPackageUrl': unity_package_url,
+        'unityPackageUrlObject': {'unityPackageUrl': unity_package_url},
+        'unityPackages': packages,
+        'updated_at': timestamp(3600),
+        'version': 1,
+    }
+
+
+def moderation_payload(user_id, display_name=None):
+    return {
+        'created': timestamp(3600),
+        'id': f"pmod_{user_id[4:]}",
+        'sourceDisplayName': OWNER_NAME,
+        'sourceUserId': OWNER_ID,
+        'targetDisplayName': display_name or f"User {user_id[-6:]}",
+        'targetUserId': user_id,
+        'type': 'block',
+    }
+
+
+def bench_user_id(i):
+    return f"usr_00000000-0000-4000-8000-{i:012x}"
+
+
+def bench_avatar_id(i):
+    return f"avtr_00000000-0000-4000-8000-{i:012x}"
+
+
+class Behavior:
+    """Latency and failure injection shared by one server's handlers
+
+    Args:
+        latency (float): Seconds added to every response
+        jitter (float): Up to this many seconds added or removed at random
+        error_rate (float): Fraction of requests answered with a 502
+        throttle_rate (float): Fraction of requests answered with a 429
+        retry_after (int): Retry-After seconds sent with every 429
+        max_rps (float): Requests per second above which the server answers 429 (0 = no limit)
+        seed (int): Seed for the random decisions
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, throttle_rate=0.0, retry_after=1,
+                 max_rps=0.0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.max_rps = max_rps
+        self.stats = Counter()
+        self._random = random.Random(seed)
+        self._tokens = max_rps
+        self._refilled = time.monotonic()
+        self._lock = threading.Lock()
+
+    def delay(self):
+        with self._lock:
+            jitter = self._random.uniform(-self.jitter, self.jitter) if self.jitter else 0.0
+        seconds = max(0.0, self.latency + jitter)
+        if seconds:
+            time.sleep(seconds)
+
+    def outcome(self):
+        """'throttle', 'error' or None for a normal answer"""
+        with self._lock:
+            if self.max_rps:
+                now = time.monotonic()
+                self._tokens = min(self.max_rps, self._tokens + (now - self._refilled) * self.max_rps)
+                self._refilled = now
+                if self._tokens < 1:
+                    return 'throttle'
+                self._tokens -= 1
+            roll = self._random.random()
+        if roll < self.throttle_rate:
+            return 'throttle'
+        if roll < self.throttle_rate + self.error_rate:
+            return 'error'
+        return None
+
+    def count(self, name, status):
+        self.add(f"{name} {status}")
+
+    def add(self, key, amount=1):
+        with self._lock:
+            self.stats[key] += amount
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    routes = ()  # (method, path regex, handler method name)
+
+    @property
+    def behavior(self):
+        return self.server.behavior
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, data=None, headers=None):
+        body = b'' if data is None else json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        if data is not None:
+            self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, str(value))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if not length:
+            return {}
+        try:
+            return json.loads(self.rfile.read(length))
+        except ValueError:
+            return {}
+
+    def _dispatch(self, method):
+        url = urlsplit(self.path)
+        body = self._body() if method in ('POST', 'PUT') else {}
+        if url.path == '/_stats':
+            return self._send(200, dict(self.behavior.stats))
+        for route_method, pattern, name in self.routes:
+            if route_method != method:
+                continue
+            match = pattern.match(url.path)
+            if not match:
+                continue
+            query = {key: values[0] for key, values in parse_qs(url.query).items()}
+            self.behavior.delay()
+            outcome = self.behavior.outcome()
+            if outcome:
+                return self._fail(name, outcome)
+            status, data, headers = getattr(self, name)(*match.groups(), query=query, body=body)
+            self.behavior.count(name, status)
+            return self._send(status, data, headers)
+        self._send(404, {'error': {'message': "Not found", 'status_code': 404}})
+
+    def _fail(self, name, outcome):
+        self.behavior.count(name, 429 if outcome == 'throttle' else 502)
+        if outcome == 'throttle':
+            return self._send(429, {'error': {'message': "Too many requests", 'status_code': 429}},
+                              {'Retry-After': self.behavior.retry_after})
+        self._send(502, {'error': {'message': "Bad gateway", 'status_code': 502}})
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def do_PUT(self):
+        self._dispatch('PUT')
+
+
+class VRChatHandler(MockHandler):
+    routes = (
+        ('GET', AVATAR_PATH, 'get_avatar'),
+        ('PUT', AVATAR_PATH, 'update_avatar'),
+        ('GET', AVATARS_PATH, 'search_avatars'),
+        ('GET', MODERATIONS_PATH, 'get_player_moderations'),
+        ('POST', MODERATIONS_PATH, 'moderate_user'),
+        ('PUT', UNMODERATE_PATH, 'unmoderate_user'),
+    )
+
+    def get_avatar(self, avatar_id, query, body):
+        owned = self.server.owned_avatars.get(avatar_id)
+        if owned:
+            return 200, owned, None
+        if stable_fraction(avatar_id) < self.server.missing_rate:
+            return 404, {'error': {'message': f"Avatar {avatar_id} not found", 'status_code': 404}}, None
+        return 200, avatar_payload(avatar_id), None
+
+    def update_avatar(self, avatar_id, query, body):
+        with self.server.lock:
+            avatar = self.server.owned_avatars.get(avatar_id)
+            if avatar is None:
+                return 404, {'error': {'message': f"Avatar {avatar_id} not found", 'status_code': 404}}, None
+            for key in ('name', 'description', 'releaseStatus', 'imageUrl'):
+                if key in body:
+                    avatar[key] = body[key]
+            avatar['updated_at'] = timestamp()
+            return 200, dict(avatar), None
+
+    def search_avatars(self, query, body):
+        avatars = list(self.server.owned_avatars.values())
+        if query.get('userId') not in (None, OWNER_ID):
+            avatars = []
+        release_status = query.get('releaseStatus', 'public')
+        if release_status != 'all':
+            avatars = [avatar for avatar in avatars if avatar['releaseStatus'] == release_status]
+        offset = int(query.get('offset', 0))
+        n = min(100, int(query.get('n', 60)))
+        return 200, avatars[offset:offset + n], None
+
+    def get_player_moderations(self, query, body):
+        moderations = list(self.server.moderations.values())
+        if query.get('type'):
+            moderations = [mod for mod in moderations if mod['type'] == query['type']]
+        return 200, moderations, None
+
+    def moderate_user(self, query, body):
+        user_id = body.get('moderated')
+        if not user_id:
+            return 400, {'error': {'message': "Missing moderated", 'status_code': 400}}, None
+        with self.server.lock:
+            moderation = self.server.moderations.setdefault(user_id, moderation_payload(user_id))
+        return 200, moderation, None
+
+    def unmoderate_user(self, query, body):
+        with self.server.lock:
+            self.server.moderations.pop(body.get('moderated'), None)
+        return 200, {'success': {'message': "Unmoderated user", 'status_code': 200}}, None
+
+
+class DiscordHandler(MockHandler):
+    routes = (
+        ('POST', WEBHOOK_PATH, 'execute_webhook'),
+    )
+
+    def _fail(self, name, outcome):
+        if outcome != 'throttle':
+            return super()._fail(name, outcome)
+        self.behavior.count(name, 429)
+        retry_after = self.behavior.retry_after
+        self._send(429, {'message': "You are being rate limited.", 'retry_after': retry_after, 'global': False},
+                   {'Retry-After': retry_after})
+
+    def execute_webhook(self, webhook_id, token, query, body):
+        embeds = body.get('embeds') or []
+        if not embeds and not body.get('content'):
+            return 400, {'message': "Cannot send an empty message", 'code': 50006}, None
+        self.behavior.add('embeds', len(embeds))
+        headers = {'X-RateLimit-Bucket': f"bench-{webhook_id}"}
+        headers.update(self.server.bucket_headers(webhook_id))
+        if query.get('wait') == 'true':
+            return 200, {'id': str(random.randrange(10 ** 17, 10 ** 18)), 'embeds': embeds}, headers
+        return 204, None, headers
+
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, handler, behavior, host='127.0.0.1', port=0):
+        super().__init__((host, port), handler)
+        self.behavior = behavior
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+class MockVRChat(MockServer):
+    """VRChat API stand-in
+
+    Args:
+        behavior (Behavior): Latency and failure injection
+        owned_avatars (int): Avatars owned by the logged in user (for search/update)
+        blocked_users (int): Users already on the block list
+        missing_rate (float): Fraction of other avatar IDs that answer 404
+    """
+
+    def __init__(self, behavior, owned_avatars=200, blocked_users=500, missing_rate=0.05, host='127.0.0.1', port=0):
+        super().__init__(VRChatHandler, behavior, host, port)
+        self.missing_rate = missing_rate
+        self.owned_avatars = {}
+        for i in range(owned_avatars):
+            avatar_id = bench_avatar_id(i)
+            self.owned_avatars[avatar_id] = avatar_payload(
+                avatar_id, OWNER_ID, OWNER_NAME, 'public' if i % 2 else 'private', index=i
+            )
+        self.moderations = {}
+        for i in range(blocked_users):
+            user_id = bench_user_id(i)
+            self.moderations[user_id] = moderation_payload(user_id)
+
+    @property
+    def api_url(self):
+        return f"{self.url}/api/1"
+
+
+class MockDiscord(MockServer):
+    """Discord webhook stand-in
+
+    With bucket_size set, every webhook allows that many messages per
+    bucket_reset seconds and says so in X-RateLimit-* headers, like Discord.
+    """
+
+    def __init__(self, behavior, bucket_size=0, bucket_reset=2.0, host='127.0.0.1', port=0):
+        super().__init__(DiscordHandler, behavior, host, port)
+        self.bucket_size = bucket_size
+        self.bucket_reset = bucket_reset
+        self._buckets = {}  # webhook id -> (window start, messages sent)
+
+    def bucket_headers(self, webhook_id):
+        if not self.bucket_size:
+            return {}
+        with self.lock:
+            now = time.monotonic()
+            started, sent = self._buckets.get(webhook_id, (now, 0))
+            if now - started >= self.bucket_reset:
+                started, sent = now, 0
+            sent += 1
+            self._buckets[webhook_id] = (started, sent)
+        return {
+            'X-RateLimit-Limit': self.bucket_size,
+            'X-RateLimit-Remaining': max(0, self.bucket_size - sent),
+            'X-RateLimit-Reset-After': f"{max(0.0, self.bucket_reset - (now - started)):.3f}",
+        }
+
+
+def add_behavior_args(parser, prefix, name):
+    """Latency/failure options for one server, e.g. --vrchat-latency-ms"""
+    parser.add_argument(f'--{prefix}-latency-ms', type=float, default=30.0,
+                        help=f"{name} response time in milliseconds (default: 30)")
+    parser.add_argument(f'--{prefix}-jitter-ms', type=float, default=10.0,
+                        help=f"random +/- added to the {name} response time (default: 10)")
+    parser.add_argument(f'--{prefix}-error-rate', type=float, default=0.0,
+                        help=f"fraction of {name} requests failing with a 5xx (default: 0)")
+    parser.add_argument(f'--{prefix}-throttle-rate', type=float, default=0.0,
+                        help=f"fraction of {name} requests answered with 429 (default: 0)")
+    parser.add_argument(f'--{prefix}-retry-after', type=int, default=1,
+                        help=f"whole Retry-After seconds on {name} 429s, like the real header (default: 1)")
+
+
+def behavior_from_args(args, prefix, seed=None):
+    prefix = prefix.replace('-', '_')
+    return Behavior(
+        latency=getattr(args, f'{prefix}_latency_ms') / 1000,
+        jitter=getattr(args, f'{prefix}_jitter_ms') / 1000,
+        error_rate=getattr(args, f'{prefix}_error_rate'),
+        throttle_rate=getattr(args, f'{prefix}_throttle_rate'),
+        retry_after=getattr(args, f'{prefix}_retry_after'),
+        max_rps=getattr(args, f'{prefix}_max_rps', 0.0),
+        seed=seed,
+    )
+
+
+def add_server_args(parser):
+    add_behavior_args(parser, 'vrchat', "VRChat")
+    parser.add_argument('--vrchat-max-rps', type=float, default=0.0,
+                        help="answer 429 above this many VRChat requests per second (default: no limit)")
+    parser.add_argument('--missing-rate', type=float, default=0.05,
+                        help="fraction of avatar IDs that are not found (default: 0.05)")
+    parser.add_argument('--owned-avatars', type=int, default=200,
+                        help="avatars owned by the benchmark user (default: 200)")
+    parser.add_argument('--blocked-users', type=int, default=500,
+                        help="users already blocked (default: 500)")
+    add_behavior_args(parser, 'discord', "Discord")
+    parser.add_argument('--discord-bucket', type=int, default=0,
+                        help="messages per webhook per --discord-bucket-reset seconds (default: unlimited)")
+    parser.add_argument('--discord-bucket-reset', type=float, default=2.0,
+                        help="length of a Discord rate limit window in seconds (default: 2)")
+    parser.add_argument('--seed', type=int, default=1, help="seed for injected failures (default: 1)")
+
+
+def start_servers(args, host='127.0.0.1', vrchat_port=0, discord_port=0):
+    """Start both mock servers in background threads, returns (vrchat, discord)"""
+    vrchat = MockVRChat(
+        behavior_from_args(args, 'vrchat', args.seed),
+        owned_avatars=args.owned_avatars,
+        blocked_users=args.blocked_users,
+        missing_rate=args.missing_rate,
+        host=host,
+        port=vrchat_port,
+    ).start()
+    discord = MockDiscord(
+        behavior_from_args(args, 'discord', args.seed + 1),
+        bucket_size=args.discord_bucket,
+        bucket_reset=args.discord_bucket_reset,
+        host=host,
+        port=discord_port,
+    ).start()
+    return vrchat, discord
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run local VRChat API and Discord webhook stand-ins")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--vrchat-port', type=int, default=8700)
+    parser.add_argument('--discord-port', type=int, default=8701)
+    add_server_args(parser)
+    args = parser.parse_args()
+
+    vrchat, discord = start_servers(args, args.host, args.vrchat_port, args.discord_port)
+    print(f"[Mock] VRChat API: {vrchat.api_url}", flush=True)
+    print(f"[Mock] Discord:    {discord.url}/api/webhooks/<id>/<token>", flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        print("\n[Mock] VRChat requests:", dict(vrchat.behavior.stats))
+        print("[Mock] Discord requests:", dict(discord.behavior.stats))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import threading
+import time
+
+from vrchat_session import SessionError, session_lost
+
+
+class ApiCall:
+    """One VRChat call running on the API client's thread pool
+
+    Args:
+        async_result (multiprocessing.pool.AsyncResult): What the generated
+            API method returned for async_req=True
+        tag: Anything the caller wants back with the result (an ID, a line offset...)
+    """
+
+    def __init__(self, async_result, tag=None):
+        self.async_result = async_result
+        self.tag = tag
+        self.submitted_at = time.monotonic()
+        self.timed_out = None  # Seconds it was given up after, if it never finished
+
+    def ready(self):
+        return self.timed_out is not None or self.async_result.ready()
+
+    def result(self):
+        """The deserialized response, raises whatever the call raised (ApiException, ValueError...)
+
+        A call given up on raises TimeoutError. If the session expired and
+        could not be renewed on the pool, the program exits here when this
+        is the main thread.
+        """
+        if self.timed_out is not None and not self.async_result.ready():
+            raise TimeoutError(f"No response from VRChat after {self.timed_out:g}s")
+        try:
+            return self.async_result.get()
+        except SessionError as e:
+            session_lost(e)
+
+
+class ApiExecutor:
+    """Pipelines calls like get_avatar, moderate_user and update_avatar
+
+    The generated vrchatapi methods accept async_req=True and then run on
+    the ApiClient's own thread pool (pool_threads) instead of blocking, so
+    the network latency of several calls overlaps without any threading
+    code in the tools. Everything installed on api_client.request (rate
+    limiter, metrics, session renewal) still applies to each call.
+
+    The pool's results have no completion callback, so next_completed()
+    waits on the oldest call and checks the others every poll_interval
+    seconds; calls come back in the order they finish. A call still
+    unfinished call_timeout seconds after it was submitted is handed back
+    anyway and its result() raises TimeoutError, so a stuck pool thread
+    can't block a run forever.
+
+    Args:
+        api_client (vrchatapi.ApiClient): Logged in client whose pool runs the calls
+        pool_size (int): Calls in flight at the same time
+        poll_interval (float): How often unfinished calls are checked
+        call_timeout (float): Seconds before an unfinished call is given up on,
+            long enough for the rate limiter's own waits and retries
+    """
+
+    def __init__(self, api_client, pool_size=4, poll_interval=0.005, call_timeout=600):
+        self.api_client = api_client
+        self.poll_interval = poll_interval
+        self.call_timeout = call_timeout
+        self.pool_size = None
+        self._timed_out = False  # Whether the current pool still has threads stuck on given up calls
+        self._pending = []
+        self._lock = threading.Lock()
+        self.resize(pool_size)
+
+    def resize(self, pool_size):
+        """Use a differently sized pool, waiting for calls still running on the old one"""
+        pool_size = max(1, int(pool_size))
+        if pool_size == self.pool_size:
+            return
+        self._close_pool()  # The pool is created again on the next call
+        self.api_client.pool_threads = pool_size
+        self.pool_size = pool_size
+        # Keep one pooled connection per thread instead of reconnecting for every call
+        pool_manager = self.api_client.rest_client.pool_manager
+        if pool_manager.connection_pool_kw.get('maxsize', 1) < pool_size:
+            pool_manager.connection_pool_kw['maxsize'] = pool_size
+            pool_manager.clear()
+
+    def submit(self, api_method, *args, tag=None, **kwargs):
+        """Start api_method(*args, **kwargs) on the pool, returns its ApiCall"""
+        call = ApiCall(api_method(*args, async_req=True, **kwargs), tag)
+        with self._lock:
+            self._pending.append(call)
+        return call
+
+    @property
+    def pending(self):
+        """Number of calls submitted but not handed back by next_completed() yet"""
+        return len(self._pending)
+
+    def pending_calls(self):
+        """The calls not handed back yet, oldest first"""
+        with self._lock:
+            return list(self._pending)
+
+    def next_completed(self, timeout=None):
+        """Wait for the next call to finish (or time out) and return it, or None after timeout seconds
+
+        Also returns None straight away when nothing is pending.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                if not self._pending:
+                    return None
+                for i, call in enumerate(self._pending):
+                    if call.ready():
+                        return self._pending.pop(i)
+                oldest = self._pending[0]
+                if time.monotonic() - oldest.submitted_at >= self.call_timeout:
+                    oldest.timed_out = self.call_timeout
+                    self._timed_out = True
+                    return self._pending.pop(0)
+            wait = self.poll_interval
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                wait = min(wait, remaining)
+            oldest.async_result.wait(wait)
+
+    def as_completed(self):
+        """Yield every pending call as it finishes"""
+        while True:
+            call = self.next_completed()
+            if call is None:
+                return
+            yield call
+
+    def _close_pool(self):
+        pool = self.api_client._pool
+        if self._timed_out and pool is not None:
+            # Joining would wait on the stuck threads forever; they are daemon
+            # threads, so just let the idle ones exit and start a new pool
+            pool.close()
+            self.api_client._pool = None
+            self._timed_out = False
+        else:
+            self.api_client.close()
+
+    def close(self):
+        """Wait for running calls and stop the pool's threads"""
+        self._close_pool()
@@ -0,0 +1,355 @@
+import bisect
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+from vrchatapi.exceptions import ApiException
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+HELP = {
+    'vrchat_request_duration_seconds': "Time per VRChat API request (one attempt as the client sees it)",
+    'vrchat_requests_total': "VRChat API requests by endpoint and HTTP status",
+    'discord_webhook_duration_seconds': "Time per Discord webhook post (one attempt)",
+    'discord_webhook_requests_total': "Discord webhook posts by HTTP status",
+    'retries_total': "Requests sent again, by service and reason",
+    'cache_lookups_total': "Cache lookups by cache and result",
+    'sleep_seconds_total': "Time threads spent sleeping, by reason",
+    'processed_lookup_duration_seconds': "Time per processed-log membership check",
+}
+
+_ID_PATTERN = re.compile(r'\b(avtr|usr|file|wrld|pmod|unp|grp)_[0-9A-Za-z-]+')
+
+
+def endpoint_label(method, url):
+    """'GET /avatars/{id}' style label with IDs and query strings removed"""
+    path = urlparse(url).path
+    if path.startswith('/api/1'):
+        path = path[len('/api/1'):]
+    return f"{method} {_ID_PATTERN.sub('{id}', path)}"
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key, extra=()):
+    items = list(key) + list(extra)
+    if not items:
+        return ''
+    return '{' + ','.join(f'{name}="{str(value)}"' for name, value in items) + '}'
+
+
+class Histogram:
+    """Bucketed latency distribution with a running sum and count"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Estimate a quantile by interpolating inside its bucket, like Prometheus does"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                if i >= len(self.buckets):
+                    return lower
+                return lower + (self.buckets[i] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+
+class MetricsRegistry:
+    """Thread-safe counters and histograms shared by every module of a script"""
+
+    def __init__(self):
+        self.started = time.time()
+        self._counters = {}    # name -> {label key: value}
+        self._histograms = {}  # name -> {label key: Histogram}
+        self._lock = threading.Lock()
+
+    def inc(self, name, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            values = self._counters.setdefault(name, {})
+            values[key] = values.get(key, 0) + amount
+
+    def observe(self, name, seconds, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            histograms = self._histograms.setdefault(name, {})
+            if key not in histograms:
+                histograms[key] = Histogram()
+            histograms[key].observe(seconds)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def add_sleep(self, reason, seconds):
+        if seconds > 0:
+            self.inc('sleep_seconds_total', seconds, reason=reason)
+
+    def sleep(self, seconds, reason):
+        """time.sleep() that is counted in sleep_seconds_total"""
+        if seconds > 0:
+            time.sleep(seconds)
+            self.add_sleep(reason, seconds)
+
+    def render_prometheus(self):
+        """Everything in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            for name, values in sorted(self._counters.items()):
+                lines.append(f"# HELP {name} {HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} counter")
+                for key, value in sorted(values.items()):
+                    lines.append(f"{name}{_format_labels(key)} {value:g}")
+            for name, histograms in sorted(self._histograms.items()):
+                lines.append(f"# HELP {name} {HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} histogram")
+                for key, histogram in sorted(histograms.items()):
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets + (float('inf'),), histogram.counts):
+                        cumulative += count
+                        le = '+Inf' if bound == float('inf') else f"{bound:g}"
+                        lines.append(f"{name}_bucket{_format_labels(key, [('le', le)])} {cumulative}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {histogram.sum:.6f}")
+                    lines.append(f"{name}_count{_format_labels(key)} {histogram.count}")
+        lines.append(f"process_uptime_seconds {time.time() - self.started:.3f}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        """End-of-run numbers as plain JSON-friendly dicts"""
+        def latencies(name, group_by):
+            result = {}
+            for key, histogram in self._histograms.get(name, {}).items():
+                group = dict(key).get(group_by, 'all')
+                result[group] = {
+                    'count': histogram.count,
+                    'total_seconds': round(histogram.sum, 3),
+                    'mean_ms': round(histogram.sum / histogram.count * 1000, 2) if histogram.count else 0.0,
+                    'p50_ms': round(histogram.quantile(0.50) * 1000, 2),
+                    'p99_ms': round(histogram.quantile(0.99) * 1000, 2),
+                }
+            return result
+
+        def statuses(name, group_by):
+            result = {}
+            for key, value in self._counters.get(name, {}).items():
+                labels = dict(key)
+                group = result.setdefault(labels.get(group_by, 'all'), {})
+                group[labels['status']] = group.get(labels['status'], 0) + value
+            return result
+
+        with self._lock:
+            vrchat = latencies('vrchat_request_duration_seconds', 'endpoint')
+            for endpoint, counts in statuses('vrchat_requests_total', 'endpoint').items():
+                vrchat.setdefault(endpoint, {})['statuses'] = counts
+            discord = latencies('discord_webhook_duration_seconds', 'service').get('all', {})
+            discord['statuses'] = statuses('discord_webhook_requests_total', 'service').get('all', {})
+
+            caches = {}
+            for key, value in self._counters.get('cache_lookups_total', {}).items():
+                labels = dict(key)
+                cache = caches.setdefault(labels['cache'], {'hits': 0, 'misses': 0})
+                cache['hits' if labels['result'] == 'hit' else 'misses'] += value
+            for cache in caches.values():
+                lookups = cache['hits'] + cache['misses']
+                cache['hit_ratio'] = round(cache['hits'] / lookups, 4) if lookups else 0.0
+
+            retries = {}
+            for key, value in self._counters.get('retries_total', {}).items():
+                labels = dict(key)
+                retries[f"{labels['service']} {labels['reason']}"] = value
+
+            sleeping = {dict(key)['reason']: round(value, 3)
+                        for key, value in self._counters.get('sleep_seconds_total', {}).items()}
+            processed = latencies('processed_lookup_duration_seconds', 'store').get('all')
+
+        wall = time.time() - self.started
+        request_seconds = sum(entry.get('total_seconds', 0) for entry in vrchat.values())
+        return {
+            'started_at': datetime.fromtimestamp(self.started, timezone.utc).isoformat(timespec='seconds'),
+            'wall_seconds': round(wall, 3),
+            'vrchat': vrchat,
+            'discord': discord,
+            'retries': retries,
+            'caches': caches,
+            'processed_lookups': processed,
+            # Totals over all threads, so they can exceed wall_seconds with several workers
+            'time': {
+                'vrchat_request_seconds': round(request_seconds, 3),
+                'discord_request_seconds': discord.get('total_seconds', 0.0),
+                'sleep_seconds': sleeping,
+            },
+        }
+
+
+registry = MetricsRegistry()
+
+inc = registry.inc
+observe = registry.observe
+timer = registry.timer
+add_sleep = registry.add_sleep
+sleep = registry.sleep
+
+
+def instrument_api_client(api_client):
+    """Time every request of a vrchatapi.ApiClient and count it by endpoint and status
+
+    Install it before the rate limiter and session renewal, so each attempt
+    (including throttled and retried ones) is recorded separately.
+    """
+    original_request = api_client.request
+
+    def timed_request(method, url, *args, **kwargs):
+        endpoint = endpoint_label(method, url)
+        started = time.perf_counter()
+        status = 'error'
+        try:
+            response = original_request(method, url, *args, **kwargs)
+            status = getattr(response, 'status', 200)
+            return response
+        except ApiException as e:
+            status = e.status or 'error'
+            raise
+        finally:
+            registry.observe('vrchat_request_duration_seconds', time.perf_counter() - started, endpoint=endpoint)
+            registry.inc('vrchat_requests_total', endpoint=endpoint, status=str(status))
+
+    api_client.request = timed_request
+    return api_client
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/metrics', '/'):
+            self.send_error(404)
+            return
+        body = registry.render_prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MetricsExporter:
+    """Publishes the registry while a script runs and summarizes it at the end
+
+    Args:
+        prometheus_file (str): Text file rewritten every interval seconds (node_exporter textfile format)
+        port (int): Serve /metrics on this port (0 = off)
+        summary_file (str): JSON summary written on close
+        interval (float): Seconds between prometheus_file updates
+    """
+
+    def __init__(self, prometheus_file=None, port=0, summary_file=None, interval=15.0, host='127.0.0.1'):
+        self.prometheus_file = prometheus_file
+        self.port = port
+        self.summary_file = summary_file
+        self.interval = interval
+        self._server = None
+        self._stop = threading.Event()
+        self._closed = False
+        if prometheus_file:
+            threading.Thread(target=self._write_loop, daemon=True).start()
+        if port:
+            self._server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            self._server.daemon_threads = True
+            threading.Thread(target=self._server.serve_forever, daemon=True).start()
+            print(f"[Metrics] Serving Prometheus metrics on http://{host}:{port}/metrics")
+
+    @classmethod
+    def from_config(cls, metrics_config, base_dir=None):
+        """Build an exporter from a 'metrics' config section
+
+        VRCHAT_METRICS_FILE, VRCHAT_METRICS_PORT and VRCHAT_METRICS_SUMMARY
+        override the file, port and summary settings.
+        """
+        if not metrics_config.get('enabled', True):
+            return cls()
+
+        def path(value):
+            if value and base_dir and not os.path.isabs(value):
+                return os.path.join(base_dir, value)
+            return value or None
+
+        return cls(
+            prometheus_file=path(os.environ.get('VRCHAT_METRICS_FILE') or metrics_config.get('prometheus_file')),
+            port=int(os.environ.get('VRCHAT_METRICS_PORT') or metrics_config.get('prometheus_port') or 0),
+            summary_file=path(os.environ.get('VRCHAT_METRICS_SUMMARY') or metrics_config.get('summary_file', 'run_metrics.json')),
+            interval=metrics_config.get('write_interval', 15),
+        )
+
+    def _write_loop(self):
+        while not self._stop.wait(self.interval):
+            self.write_prometheus()
+
+    def write_prometheus(self):
+        tmp_path = self.prometheus_file + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(registry.render_prometheus())
+        os.replace(tmp_path, self.prometheus_file)
+
+    def close(self):
+        """Write the final metrics and the JSON summary, returns the summary"""
+        if self._closed:
+            return None
+        self._closed = True
+        self._stop.set()
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+        if self.prometheus_file:
+            self.write_prometheus()
+        summary = registry.summary()
+        if self.summary_file:
+            with open(self.summary_file, 'w', encoding='utf-8') as f:
+                json.dump(summary, f, indent=2)
+        print_summary(summary)
+        if self.summary_file:
+            print(f"[Metrics] Run summary written to {self.summary_file}")
+        return summary
+
+
+def print_summary(summary):
+    """A few lines of the summary for the console"""
+    for endpoint, entry in sorted(summary['vrchat'].items()):
+        statuses = ", ".join(f"{status}: {count}" for status, count in sorted(entry.get('statuses', {}).items(), key=str))
+        print(f"\n[Metrics] {endpoint}: {entry.get('count', 0)} requests, "
+              f"p50 {entry.get('p50_ms', 0):.0f}ms, p99 {entry.get('p99_ms', 0):.0f}ms ({statuses})")
+    discord = summary['discord']
+    if discord.get('count'):
+        print(f"[Metrics] Discord: {discord['count']} posts, p50 {discord['p50_ms']:.0f}ms, p99 {discord['p99_ms']:.0f}ms")
+    for name, cache in sorted(summary['caches'].items()):
+        print(f"[Metrics] {name} cache: {cache['hit_ratio']:.0%} hit ratio ({cache['hits']} hits, {cache['misses']} misses)")
+    sleeping = summary['time']['sleep_seconds']
+    if sleeping:
+        print("[Metrics] Sleeping: " + ", ".join(f"{reason} {seconds:.1f}s" for reason, seconds in sorted(sleeping.items())))
@@ -0,0 +1,243 @@
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+from vrchatapi.exceptions import ApiException
+
+import metrics
+
+
+class TokenBucket:
+    """Thread-safe token bucket used to pace VRChat API requests
+
+    Args:
+        rate (float): Tokens added per second (sustained requests per second)
+        capacity (int): Maximum tokens stored, i.e. the allowed burst size
+    """
+
+    def __init__(self, rate, capacity=1):
+        if rate <= 0:
+            raise ValueError("rate must be greater than 0")
+        self.rate = float(rate)
+        self.capacity = max(1, int(capacity))
+        self._tokens = float(self.capacity)
+        self._last = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, vrchat_config):
+        """Build a bucket from the 'vrchat' section of config.json
+
+        Uses 'rate_limit': {"requests_per_second": ..., "burst": ...} and falls
+        back to the legacy 'rate_limit_delay' (seconds between requests).
+        """
+        rate_config = vrchat_config.get('rate_limit')
+        if rate_config:
+            return cls(rate_config.get('requests_per_second', 1.0), rate_config.get('burst', 1))
+        delay = vrchat_config.get('rate_limit_delay', 5)
+        return cls(1.0 / delay if delay > 0 else 1000.0, 1)
+
+    def _refill(self):
+        now = time.monotonic()
+        if now > self._last:
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+
+    def set_rate(self, rate):
+        """Change the refill rate, keeping the tokens earned so far"""
+        with self._lock:
+            self._refill()
+            self.rate = float(rate)
+
+    def pause(self, seconds):
+        """Hand out no tokens for the given number of seconds"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0.0
+            self._last = self._paused_until  # No tokens are earned while paused
+
+    def try_acquire(self, tokens=1):
+        """Take tokens without waiting, returns False if not enough are available"""
+        with self._lock:
+            if time.monotonic() < self._paused_until:
+                return False
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens=1):
+        """Block until tokens are available, returns the seconds spent waiting"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                else:
+                    self._refill()
+                    if self._tokens >= tokens:
+                        self._tokens -= tokens
+                        return waited
+                    wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+
+def endpoint_family(url):
+    """Map a VRChat API URL to the rate limit bucket it belongs to"""
+    path = urlparse(url).path
+    if 'playermoderations' in path:
+        return 'playermoderation'
+    if '/avatars' in path:
+        return 'avatars'
+    if '/auth' in path:
+        return 'auth'
+    return 'default'
+
+
+def parse_retry_after(headers):
+    """Return the Retry-After header in seconds, or None if missing/invalid"""
+    if not headers:
+        return None
+    value = headers.get('Retry-After') or headers.get('retry-after')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max(0.0, retry_at.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptiveRateLimiter:
+    """429-aware rate control shared by every VRChat API call
+
+    Each endpoint family (avatars, playermoderation, auth, ...) gets its own
+    token bucket. A 429 halves that family's rate and pauses it for the
+    Retry-After time (or an exponential backoff with jitter), and the request
+    is retried. Every success raises the rate again by a small step until the
+    configured rate is reached.
+
+    Args:
+        rates (dict): Per family {"requests_per_second": ..., "burst": ...}
+        default_rate (float): Requests per second for families not in rates
+        burst (int): Default bucket size
+        max_retries (int): Retries for a throttled request before giving up
+    """
+
+    def __init__(self, rates=None, default_rate=1.0, burst=1, max_retries=5,
+                 min_rate=0.05, increase_step=0.05, decrease_factor=0.5,
+                 base_backoff=1.0, max_backoff=60.0):
+        self.rates = rates or {}
+        self.default_rate = float(default_rate)
+        self.burst = burst
+        self.max_retries = max_retries
+        self.min_rate = min_rate
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._buckets = {}
+        self._max_rates = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, vrchat_config):
+        """Build a limiter from the 'vrchat' section of config.json
+
+        'rate_limit' holds the default rate and burst plus optional
+        per-family overrides under 'families'. The legacy 'rate_limit_delay'
+        is still understood when no 'rate_limit' section exists.
+        """
+        rate_config = vrchat_config.get('rate_limit')
+        if not rate_config:
+            bucket = TokenBucket.from_config(vrchat_config)
+            return cls(default_rate=bucket.rate, burst=bucket.capacity)
+        return cls(
+            rates=rate_config.get('families', {}),
+            default_rate=rate_config.get('requests_per_second', 1.0),
+            burst=rate_config.get('burst', 1),
+            max_retries=rate_config.get('max_retries', 5)
+        )
+
+    def reconfigure(self, vrchat_config):
+        """Apply changed settings from config.json to the running limiter"""
+        fresh = self.from_config(vrchat_config)
+        with self._lock:
+            self.rates = fresh.rates
+            self.default_rate = fresh.default_rate
+            self.burst = fresh.burst
+            self.max_retries = fresh.max_retries
+            for family, bucket in self._buckets.items():
+                family_config = self.rates.get(family, {})
+                rate = float(family_config.get('requests_per_second', self.default_rate))
+                self._max_rates[family] = rate
+                bucket.capacity = max(1, int(family_config.get('burst', self.burst)))
+                bucket.set_rate(rate)
+
+    def bucket(self, family):
+        """Return the token bucket for an endpoint family, creating it on first use"""
+        with self._lock:
+            if family not in self._buckets:
+                family_config = self.rates.get(family, {})
+                rate = float(family_config.get('requests_per_second', self.default_rate))
+                self._buckets[family] = TokenBucket(rate, family_config.get('burst', self.burst))
+                self._max_rates[family] = rate
+            return self._buckets[family]
+
+    def on_success(self, family):
+        """Additive increase back towards the configured rate"""
+        bucket = self.bucket(family)
+        max_rate = self._max_rates[family]
+        if bucket.rate < max_rate:
+            bucket.set_rate(min(max_rate, bucket.rate + max_rate * self.increase_step))
+
+    def on_throttle(self, family, attempt, retry_after=None):
+        """Multiplicative decrease and pause, returns the pause in seconds"""
+        bucket = self.bucket(family)
+        bucket.set_rate(max(self.min_rate, bucket.rate * self.decrease_factor))
+        if retry_after is not None:
+            delay = retry_after + random.uniform(0, 1)
+        else:
+            delay = min(self.max_backoff, self.base_backoff * (2 ** attempt))
+            delay = random.uniform(delay / 2, delay)
+        bucket.pause(delay)
+        return delay
+
+    def call(self, family, func, *args, **kwargs):
+        """Run func under the family's bucket, retrying when VRChat answers 429"""
+        attempt = 0
+        while True:
+            metrics.add_sleep('rate_limit', self.bucket(family).acquire())
+            try:
+                result = func(*args, **kwargs)
+            except ApiException as e:
+                if e.status != 429 or attempt >= self.max_retries:
+                    raise
+                delay = self.on_throttle(family, attempt, parse_retry_after(e.headers))
+                metrics.inc('retries_total', service='vrchat', reason='429')
+                attempt += 1
+                print(f"[!] RATE LIMITED ({family}): backing off {delay:.1f}s "
+                      f"(retry {attempt}/{self.max_retries}, now {self.bucket(family).rate:.2f} req/s)")
+                continue
+            self.on_success(family)
+            return result
+
+    def install(self, api_client):
+        """Route every request made through a vrchatapi.ApiClient via this limiter"""
+        original_request = api_client.request
+
+        def limited_request(method, url, *args, **kwargs):
+            return self.call(endpoint_family(url), original_request, method, url, *args, **kwargs)
+
+        api_client.request = limited_request
+        return api_client
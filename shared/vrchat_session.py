@@ -0,0 +1,468 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+import struct
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from http.cookiejar import Cookie
+
+import vrchatapi
+from vrchatapi.api import authentication_api
+from vrchatapi.exceptions import ApiException, UnauthorizedException
+from vrchatapi.models.two_factor_auth_code import TwoFactorAuthCode
+from vrchatapi.models.two_factor_email_code import TwoFactorEmailCode
+
+import metrics
+
+try:
+    import fcntl
+    msvcrt = None
+except ImportError:  # Windows
+    import msvcrt
+
+COOKIE_DOMAIN = "api.vrchat.cloud"
+
+
+class SessionError(Exception):
+    """No VRChat session could be had without a prompt, or the user gave up logging in"""
+
+
+def session_lost(error):
+    """Exit after a SessionError on the main thread, re-raise it anywhere else
+
+    sys.exit() on a thread pool worker only ends that worker and leaves the
+    call it was running unfinished forever, so other threads hand the error
+    to whoever collects their result.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        raise error
+    print(f"\n[!] {error}")
+    sys.exit(1)
+
+
+def make_cookie(name, value):
+    """Helper to create cookie objects"""
+    return Cookie(
+        version=0,
+        name=name,
+        value=value,
+        port=None,
+        port_specified=False,
+        domain=COOKIE_DOMAIN,
+        domain_specified=True,
+        domain_initial_dot=False,
+        path="/",
+        path_specified=True,
+        secure=False,
+        expires=None,
+        discard=False,
+        comment=None,
+        comment_url=None,
+        rest={}
+    )
+
+
+def load_cookies(api_client, cookie_file):
+    """Try loading cookies from a plain {name: value} file if it exists"""
+    if not os.path.exists(cookie_file):
+        return False
+
+    try:
+        with open(cookie_file, 'r') as f:
+            cookies = json.load(f)
+
+        apply_cookies(api_client, cookies)
+        return bool(cookies)
+    except Exception as e:
+        print(f"[!] Error loading cookies: {str(e)}")
+        return False
+
+
+def apply_cookies(api_client, cookies):
+    """Put {name: value} session cookies into a client's cookie jar"""
+    for name, value in cookies.items():
+        api_client.rest_client.cookie_jar.set_cookie(make_cookie(name, value))
+
+
+def client_cookies(api_client):
+    """The VRChat cookies currently held by a client as {name: value}"""
+    return {
+        cookie.name: cookie.value
+        for cookie in api_client.rest_client.cookie_jar
+        if cookie.domain == COOKIE_DOMAIN
+    }
+
+
+def default_session_file():
+    """Session file shared by every tool, VRCHAT_SESSION_FILE or ~/.vrchat_tools/vrchat_session.json"""
+    return os.environ.get('VRCHAT_SESSION_FILE') or os.path.join(
+        os.path.expanduser('~'), '.vrchat_tools', 'vrchat_session.json'
+    )
+
+
+def _lock_file(fd):
+    if msvcrt:
+        os.lseek(fd, 0, os.SEEK_SET)
+        while True:
+            try:
+                msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                continue  # LK_LOCK gives up after ~10 seconds, keep waiting
+    fcntl.flock(fd, fcntl.LOCK_EX)
+
+
+def _unlock_file(fd):
+    if msvcrt:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+    else:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+class SessionStore:
+    """VRChat session cookies shared by all tools and processes on the machine
+
+    The file holds {"version": n, "saved_at": ..., "cookies": {...}} and is
+    only ever replaced atomically (write to a temp file, fsync, rename), so
+    readers never see a half written session. Renewing a session happens
+    under an exclusive lock on <path>.lock; a process that waited for the
+    lock sees the version has moved on and simply picks up the new cookies
+    instead of logging in a second time. watch() polls the file and reports
+    sessions saved by other processes.
+
+    Args:
+        path (str): Session file, defaults to default_session_file()
+    """
+
+    def __init__(self, path=None):
+        self.path = path or default_session_file()
+        self.version = 0  # Version this process last loaded or saved
+        self._thread_lock = threading.RLock()
+        self._lock_depth = 0
+        self._lock_fd = None
+        # The session cookie is a login: keep the folder and file private to this user
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), mode=0o700, exist_ok=True)
+
+    def _read(self):
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return 0, {}
+        return data.get('version', 0), data.get('cookies', {})
+
+    def load(self):
+        """Return the stored cookies and remember their version"""
+        version, cookies = self._read()
+        self.version = version
+        return cookies
+
+    def disk_version(self):
+        return self._read()[0]
+
+    def save(self, cookies):
+        """Atomically store new session cookies under the next version number"""
+        with self.lock():
+            version = self.disk_version() + 1
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            try:
+                fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+                with os.fdopen(fd, 'w') as f:
+                    json.dump({'version': version, 'saved_at': time.time(), 'cookies': cookies}, f)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.path)
+                self.version = version
+                return True
+            except OSError as e:
+                print(f"[!] Error saving session: {str(e)}")
+                return False
+
+    @contextmanager
+    def lock(self):
+        """Exclusive lock across threads and processes, re-entrant within a thread"""
+        with self._thread_lock:
+            if self._lock_depth == 0:
+                self._lock_fd = os.open(self.path + '.lock', os.O_RDWR | os.O_CREAT, 0o600)
+                _lock_file(self._lock_fd)
+            self._lock_depth += 1
+            try:
+                yield self
+            finally:
+                self._lock_depth -= 1
+                if self._lock_depth == 0:
+                    _unlock_file(self._lock_fd)
+                    os.close(self._lock_fd)
+                    self._lock_fd = None
+
+    def watch(self, callback, interval=1.0):
+        """Call callback(cookies) from a daemon thread whenever another process saves a session"""
+        def poll():
+            last_stat = None
+            while True:
+                time.sleep(interval)
+                try:
+                    stat = os.stat(self.path)
+                except OSError:
+                    continue
+                if (stat.st_mtime_ns, stat.st_size) == last_stat:
+                    continue
+                last_stat = (stat.st_mtime_ns, stat.st_size)
+                version, cookies = self._read()
+                if version > self.version:
+                    self.version = version
+                    callback(cookies)
+
+        threading.Thread(target=poll, name="session-watch", daemon=True).start()
+
+
+def totp_code(secret, for_time=None, digits=6, period=30):
+    """Current RFC 6238 code for a base32 authenticator secret"""
+    secret = secret.replace(' ', '').upper()
+    key = base64.b32decode(secret + '=' * (-len(secret) % 8))
+    counter = int((time.time() if for_time is None else for_time) // period)
+    digest = hmac.new(key, struct.pack('>Q', counter), hashlib.sha1).digest()
+    offset = digest[-1] & 0x0F
+    value = struct.unpack('>I', digest[offset:offset + 4])[0] & 0x7FFFFFFF
+    return str(value % 10 ** digits).zfill(digits)
+
+
+def load_credentials(secrets_file=None):
+    """Read login details from the environment, then from a JSON secrets file
+
+    Environment: VRCHAT_USERNAME, VRCHAT_PASSWORD and VRCHAT_TOTP_SECRET.
+    The secrets file ({"username": ..., "password": ..., "totp_secret": ...})
+    is VRCHAT_SECRETS_FILE if set, otherwise secrets_file. Missing values are
+    None.
+    """
+    credentials = {}
+    path = os.environ.get('VRCHAT_SECRETS_FILE') or secrets_file
+    if path and os.path.exists(path):
+        try:
+            with open(path, 'r') as f:
+                credentials = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[!] Error reading secrets file {path}: {str(e)}")
+    return {
+        'username': os.environ.get('VRCHAT_USERNAME') or credentials.get('username'),
+        'password': os.environ.get('VRCHAT_PASSWORD') or credentials.get('password'),
+        'totp_secret': os.environ.get('VRCHAT_TOTP_SECRET') or credentials.get('totp_secret'),
+    }
+
+
+def check_session(auth_api):
+    """Return the current user if the cookies in the client are still a valid session"""
+    try:
+        current_user = auth_api.get_current_user()
+    except UnauthorizedException:
+        return None
+    return current_user if getattr(current_user, 'id', None) else None
+
+
+def _two_factor_code(error, credentials, interactive):
+    if "Email" not in str(error) and credentials.get('totp_secret'):
+        return totp_code(credentials['totp_secret'])
+    if not interactive:
+        kind = "email 2FA" if "Email" in str(error) else "2FA"
+        raise SessionError(f"VRChat asked for a {kind} code and none can be generated without a prompt.\n"
+                           "Set VRCHAT_TOTP_SECRET, or log in once interactively to save a session.")
+    return input("2FA Code: ")
+
+
+def _login(api_client, auth_api, credentials, interactive):
+    """Log in with credentials (and 2FA) on a client, returns the current user
+
+    Raises SessionError instead of prompting when interactive is False, and
+    when the user doesn't want to try again.
+    """
+    while True:
+        try:
+            if interactive and not (credentials['username'] and credentials['password']):
+                print("\nVRChat Login")
+                print("============")
+                credentials['username'] = credentials['username'] or input("Enter your VRChat username/email: ")
+                credentials['password'] = credentials['password'] or input("Enter your VRChat password: ")
+            if not (credentials['username'] and credentials['password']):
+                raise SessionError("No valid saved session and no VRChat credentials available.\n"
+                                   "Set VRCHAT_USERNAME and VRCHAT_PASSWORD or create a secrets file, or run interactively.")
+
+            try:
+                # Keep the twoFactorAuth cookie, it lets VRChat skip 2FA on the new login
+                api_client.rest_client.cookie_jar.clear(COOKIE_DOMAIN, "/", "auth")
+            except KeyError:
+                pass
+            api_client.configuration.username = credentials['username']
+            api_client.configuration.password = credentials['password']
+
+            try:
+                current_user = auth_api.get_current_user()
+            except UnauthorizedException as e:
+                if "2 Factor Authentication" not in str(e):
+                    raise
+                code = _two_factor_code(e, credentials, interactive)
+                if "Email" in str(e):
+                    auth_api.verify2_fa_email_code(two_factor_email_code=TwoFactorEmailCode(code))
+                else:
+                    auth_api.verify2_fa(two_factor_auth_code=TwoFactorAuthCode(code))
+                current_user = auth_api.get_current_user()
+
+            print(f"\nLogged in as: {current_user.display_name}")
+            return current_user
+
+        except ApiException as e:
+            print(f"\nError during login: {str(e)}")
+        finally:
+            # From here on the auth cookie is enough, don't keep sending the password
+            api_client.configuration.username = None
+            api_client.configuration.password = None
+
+        if not interactive:
+            raise SessionError("Could not log in to VRChat")
+        retry = input("\nWould you like to try again? (y/n): ")
+        if retry.lower() != 'y':
+            raise SessionError("Login cancelled")
+        credentials['username'] = credentials['password'] = None
+
+
+class Session:
+    """One VRChat client kept logged in through a shared SessionStore
+
+    Args:
+        api_client (vrchatapi.ApiClient): Client whose cookie jar is managed
+        store (SessionStore): Where the session is shared with other processes
+        secrets_file (str): Optional JSON file with credentials
+        interactive (bool): Whether prompting is allowed, and then only on the main thread
+    """
+
+    def __init__(self, api_client, store, secrets_file=None, interactive=False):
+        self.api_client = api_client
+        self.store = store
+        self.secrets_file = secrets_file
+        self.interactive = interactive
+        self.auth_api = authentication_api.AuthenticationApi(api_client)
+        self._renewing = threading.local()
+        self._failed_version = None  # Session version a login already failed for
+
+    def renew(self, stale_version):
+        """Get a working session after the one at stale_version was rejected
+
+        Only one thread or process logs in; everyone else waiting on the lock
+        finds a newer version in the store and reuses it. Returns the current
+        user, or None if another thread already renewed this client.
+
+        Raises SessionError if logging in fails. Calls that hit the same
+        expired session afterwards fail straight away instead of trying again,
+        until another process saves a new session.
+        """
+        with self.store.lock():
+            self._renewing.active = True
+            try:
+                if self.store.version != stale_version:
+                    return None  # Another thread already renewed this client's session
+                if self.store.disk_version() != stale_version:
+                    cookies = self.store.load()
+                    apply_cookies(self.api_client, cookies)
+                    current_user = check_session(self.auth_api)
+                    if current_user:
+                        print(f"\n[✓] Picked up the session renewed by another process - logged in as: {current_user.display_name}")
+                        return current_user
+                if self._failed_version == stale_version:
+                    raise SessionError("VRChat session expired and logging in again failed")
+                print("\n[!] Session has expired - logging in again")
+                # Pool threads can't prompt; their calls fail and the main thread exits instead
+                interactive = self.interactive and threading.current_thread() is threading.main_thread()
+                try:
+                    current_user = _login(self.api_client, self.auth_api,
+                                          load_credentials(self.secrets_file), interactive)
+                except SessionError:
+                    self._failed_version = stale_version
+                    raise
+                self.store.save(client_cookies(self.api_client))
+                return current_user
+            finally:
+                self._renewing.active = False
+
+    def install(self):
+        """Renew the session once and retry when any API call comes back 401
+
+        If renewing fails the main thread exits, any other thread gets the
+        SessionError raised from the call.
+        """
+        original_request = self.api_client.request
+
+        def request(method, url, *args, **kwargs):
+            version = self.store.version
+            try:
+                return original_request(method, url, *args, **kwargs)
+            except UnauthorizedException as e:
+                if e.status != 401 or getattr(self._renewing, 'active', False):
+                    raise
+            try:
+                self.renew(version)
+            except SessionError as e:
+                session_lost(e)
+            return original_request(method, url, *args, **kwargs)
+
+        self.api_client.request = request
+        # Sessions saved by other processes are used right away instead of after a 401
+        self.store.watch(lambda cookies: apply_cookies(self.api_client, cookies))
+
+
+def start_session(user_agent, store=None, secrets_file=None, rate_limiter=None, interactive=None,
+                  legacy_cookie_file=None):
+    """Log in to VRChat, prompting only when nothing else works
+
+    1. The shared session from store is checked with a single
+       get_current_user call; a valid session starts without any
+       credentials. A legacy per-script cookie file is tried next and moved
+       into the store when it still works.
+    2. Otherwise credentials come from load_credentials() and a TOTP code is
+       generated from the secret when VRChat asks for 2FA. This happens under
+       the store's lock, so concurrent processes only log in once.
+    3. Anything still missing is prompted for, unless there is no terminal
+       (cron, services) or interactive is False, in which case the process
+       exits with an error instead of hanging.
+
+    The client renews the session by itself if it expires later on.
+
+    Returns:
+        tuple: (api_client, current_user)
+    """
+    if interactive is None:
+        interactive = sys.stdin.isatty()
+    store = store or SessionStore()
+
+    api_client = vrchatapi.ApiClient(vrchatapi.Configuration())
+    api_client.user_agent = user_agent
+    metrics.instrument_api_client(api_client)
+    if rate_limiter:
+        rate_limiter.install(api_client)
+    session = Session(api_client, store, secrets_file, interactive)
+
+    cookies = store.load()
+    if cookies:
+        apply_cookies(api_client, cookies)
+        current_user = check_session(session.auth_api)
+        if current_user:
+            print(f"\n[✓] Reused saved session - logged in as: {current_user.display_name}")
+            session.install()
+            return api_client, current_user
+    elif legacy_cookie_file and load_cookies(api_client, legacy_cookie_file):
+        current_user = check_session(session.auth_api)
+        if current_user:
+            print(f"\n[✓] Reused saved session - logged in as: {current_user.display_name}")
+            store.save(client_cookies(api_client))
+            session.install()
+            return api_client, current_user
+
+    try:
+        current_user = session.renew(store.version)
+    except SessionError as e:
+        session_lost(e)
+    session.install()
+    return api_client, current_user
@@ -0,0 +1,207 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import metrics
+
+
+class AvatarCache:
+    """On-disk cache of normalized avatar results keyed by avatar ID
+
+    Entries expire after ttl seconds. When the cache holds more than
+    max_entries, the least recently used entries are evicted.
+
+    Args:
+        path (str): SQLite database file
+        ttl (float): Seconds an entry stays valid (0 = never expires)
+        max_entries (int): Size bound enforced by LRU eviction
+    """
+
+    def __init__(self, path, ttl=24 * 3600, max_entries=100000, commit_every=50):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.commit_every = commit_every
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS avatars ("
+            " avatar_id TEXT PRIMARY KEY,"
+            " data TEXT NOT NULL,"
+            " fetched_at REAL NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS avatars_last_access ON avatars (last_access)")
+        self._db.commit()
+
+    @classmethod
+    def from_config(cls, cache_config, base_dir):
+        """Build a cache from the 'cache' section of config.json, or None if disabled"""
+        if not cache_config.get('enabled', True):
+            return None
+        path = cache_config.get('file', 'avatar_cache.db')
+        if not os.path.isabs(path):
+            path = os.path.join(base_dir, path)
+        return cls(
+            path,
+            ttl=cache_config.get('ttl_hours', 24) * 3600,
+            max_entries=cache_config.get('max_entries', 100000)
+        )
+
+    def get(self, avatar_id):
+        """Return the cached result for an avatar, or None if missing or expired"""
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT data, fetched_at FROM avatars WHERE avatar_id = ?", (avatar_id,)
+            ).fetchone()
+            if row is None or (self.ttl and now - row[1] > self.ttl):
+                self.misses += 1
+                metrics.inc('cache_lookups_total', cache='avatar', result='miss')
+                return None
+            self._db.execute("UPDATE avatars SET last_access = ? WHERE avatar_id = ?", (now, avatar_id))
+            self._wrote()
+            self.hits += 1
+            metrics.inc('cache_lookups_total', cache='avatar', result='hit')
+        return json.loads(row[0])
+
+    def put(self, avatar_id, result):
+        """Store a normalized avatar result"""
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO avatars (avatar_id, data, fetched_at, last_access) VALUES (?, ?, ?, ?)",
+                (avatar_id, json.dumps(result), now, now)
+            )
+            self._wrote()
+
+    def _wrote(self):
+        self._writes += 1
+        if self._writes % self.commit_every == 0:
+            self._evict()
+            self._db.commit()
+
+    def _evict(self):
+        """Drop least recently used entries above max_entries"""
+        count = self._db.execute("SELECT COUNT(*) FROM avatars").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self._db.execute(
+                "DELETE FROM avatars WHERE avatar_id IN"
+                " (SELECT avatar_id FROM avatars ORDER BY last_access LIMIT ?)", (excess,)
+            )
+
+    def close(self):
+        with self._lock:
+            self._evict()
+            self._db.commit()
+            self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class NegativeCache:
+    """Remembers avatars that were not found, private or invalid
+
+    An ID that failed is not looked up again until its next check time.
+    The wait starts at ttl and doubles with every consecutive failure up to
+    max_ttl, so long dead IDs cost almost nothing per run. record() and
+    clear() report whether the avatar's status changed, which is used to
+    only notify Discord about real changes.
+
+    Args:
+        path (str): SQLite database file
+        ttl (float): Seconds before the first re-check
+        max_ttl (float): Longest wait between re-checks
+    """
+
+    def __init__(self, path, ttl=6 * 3600, max_ttl=7 * 24 * 3600):
+        self.path = path
+        self.ttl = ttl
+        self.max_ttl = max_ttl
+        self.skipped = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS negative ("
+            " avatar_id TEXT PRIMARY KEY,"
+            " error TEXT NOT NULL,"
+            " failures INTEGER NOT NULL,"
+            " last_checked REAL NOT NULL,"
+            " next_check REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    @classmethod
+    def from_config(cls, cache_config, base_dir):
+        """Build a negative cache from the 'cache' section of config.json, or None if disabled"""
+        if not cache_config.get('enabled', True) or not cache_config.get('negative_enabled', True):
+            return None
+        path = cache_config.get('negative_file', 'avatar_negative_cache.db')
+        if not os.path.isabs(path):
+            path = os.path.join(base_dir, path)
+        return cls(
+            path,
+            ttl=cache_config.get('negative_ttl_hours', 6) * 3600,
+            max_ttl=cache_config.get('negative_max_ttl_hours', 168) * 3600
+        )
+
+    def get(self, avatar_id):
+        """Return the cached error message if the avatar is not due for a re-check"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT error, next_check FROM negative WHERE avatar_id = ?", (avatar_id,)
+            ).fetchone()
+            if row is None or time.time() >= row[1]:
+                metrics.inc('cache_lookups_total', cache='negative', result='miss')
+                return None
+            self.skipped += 1
+            metrics.inc('cache_lookups_total', cache='negative', result='hit')
+            return row[0]
+
+    def record(self, avatar_id, error):
+        """Store a failed lookup and schedule the next check, returns True if the status changed"""
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT error, failures FROM negative WHERE avatar_id = ?", (avatar_id,)
+            ).fetchone()
+            failures = row[1] + 1 if row and row[0] == error else 1
+            wait = min(self.max_ttl, self.ttl * (2 ** (failures - 1)))
+            self._db.execute(
+                "INSERT OR REPLACE INTO negative (avatar_id, error, failures, last_checked, next_check)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (avatar_id, error, failures, now, now + wait)
+            )
+            self._db.commit()
+            return row is None or row[0] != error
+
+    def clear(self, avatar_id):
+        """Forget an avatar that is reachable again, returns True if it was cached as failed"""
+        with self._lock:
+            cursor = self._db.execute("DELETE FROM negative WHERE avatar_id = ?", (avatar_id,))
+            self._db.commit()
+            return cursor.rowcount > 0
+
+    def close(self):
+        with self._lock:
+            self._db.commit()
+            self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,124 @@
+import hashlib
+import math
+import os
+import re
+
+AVATAR_ID_RE = re.compile(
+    r'^avtr_[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$',
+    re.IGNORECASE
+)
+
+
+def is_valid_avatar_id(avatar_id):
+    """Check an ID has the avtr_<uuid> format"""
+    return bool(AVATAR_ID_RE.match(avatar_id))
+
+
+class BloomFilter:
+    """Fixed-size set membership test used to drop duplicate IDs
+
+    Memory stays the same no matter how many IDs are added. There are no
+    false negatives; with the default sizing roughly one in a million new
+    IDs is wrongly reported as already seen once `capacity` IDs were added.
+
+    Args:
+        capacity (int): Expected number of distinct IDs
+        error_rate (float): Acceptable false positive rate at capacity
+    """
+
+    def __init__(self, capacity=5000000, error_rate=1e-6):
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, int(round(self.size / capacity * math.log(2))))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, item):
+        """Add an item, returns False if it was (probably) already present"""
+        added = False
+        for position in self._positions(item):
+            byte, bit = divmod(position, 8)
+            if not self._bits[byte] & (1 << bit):
+                self._bits[byte] |= 1 << bit
+                added = True
+        return added
+
+
+class AvatarIdReader:
+    """Streams valid, de-duplicated avatar IDs from a text file
+
+    Lines are read one at a time, so memory does not grow with the file.
+    Blank lines and '#' comments are skipped, IDs that are not avtr_<uuid>
+    are counted as invalid, and repeats are dropped with a BloomFilter.
+    Reading can start at a byte offset saved by an earlier run; after each
+    yielded ID, `line_offset` is where its line starts and `offset` is
+    where the next line starts.
+
+    Args:
+        filename (str): ID list, one avatar ID per line
+        start_offset (int): Byte offset to start reading from
+        dedupe_capacity (int): Expected number of distinct IDs
+        seen (BloomFilter): Share duplicate detection with earlier readers
+        complete_lines_only (bool): Stop at a last line without a newline
+            (still being written) instead of reading it
+    """
+
+    def __init__(self, filename, start_offset=0, dedupe_capacity=5000000, seen=None, complete_lines_only=False):
+        self.filename = filename
+        self.start_offset = start_offset
+        self.line_offset = start_offset
+        self.offset = start_offset
+        self.complete_lines_only = complete_lines_only
+        self._seen = seen if seen is not None else BloomFilter(dedupe_capacity)
+        self.stats = {'ids': 0, 'duplicates': 0, 'invalid': 0, 'comments': 0}
+
+    def __iter__(self):
+        with open(self.filename, 'rb') as f:
+            f.seek(self.start_offset)
+            while True:
+                line_offset = f.tell()
+                raw = f.readline()
+                if not raw or (self.complete_lines_only and not raw.endswith(b'\n')):
+                    break
+                self.offset = f.tell()
+                line = raw.decode('utf-8', errors='replace').strip().lstrip('\ufeff')
+                if not line:
+                    continue
+                if line.startswith('#'):
+                    self.stats['comments'] += 1
+                    continue
+                if not is_valid_avatar_id(line):
+                    self.stats['invalid'] += 1
+                    print(f"[!] Skipping invalid avatar ID: {line[:60]}")
+                    continue
+                if not self._seen.add(line.lower()):
+                    self.stats['duplicates'] += 1
+                    continue
+                self.stats['ids'] += 1
+                self.line_offset = line_offset
+                yield line
+
+
+def offset_file_for(filename):
+    return filename + '.offset'
+
+
+def load_offset(filename):
+    """Return the byte offset saved for an ID list, or 0"""
+    try:
+        with open(offset_file_for(filename), 'r') as f:
+            return int(f.read().strip() or 0)
+    except (FileNotFoundError, ValueError):
+        return 0
+
+
+def save_offset(filename, offset):
+    """Atomically save how far into an ID list a run got"""
+    offset_file = offset_file_for(filename)
+    with open(offset_file + '.tmp', 'w') as f:
+        f.write(str(offset))
+    os.replace(offset_file + '.tmp', offset_file)
@@ -1,152 +1,173 @@
-import vrchatapi
-import json
-from vrchatapi.api import authentication_api, avatars_api
-from vrchatapi.exceptions import ApiException, UnauthorizedException
-import time
-import sys
 import os
-import requests
-from http.cookiejar import Cookie
-
-def make_cookie(name, value):
-    """Helper to create cookie objects"""
-    return Cookie(
-        version=0,
-        name=name,
-        value=value,
-        port=None,
-        port_specified=False,
-        domain="api.vrchat.cloud",
-        domain_specified=True,
-        domain_initial_dot=False,
-        path="/",
-        path_specified=True,
-        secure=False,
-        expires=None,
-        discard=False,
-        comment=None,
-        comment_url=None,
-        rest={}
-    )
+import sys
 
-def load_cookies(api_client):
-    """Try loading cookies from file if they exist"""
-    cookie_file = os.path.join(os.path.dirname(__file__), 'vrchat_cookies.json')
-    if not os.path.exists(cookie_file):
-        return False
-        
-    try:
-        with open(cookie_file, 'r') as f:
-            cookies = json.load(f)
-            
-        for name, value in cookies.items():
-            api_client.rest_client.cookie_jar.set_cookie(
-                make_cookie(name, value)
-            )
-        return True
-    except Exception as e:
-        print(f"[!] Error loading cookies: {str(e)}")
-        return False
-
-def save_cookies(api_client):
-    """Save cookies to file for future use"""
-    cookie_file = os.path.join(os.path.dirname(__file__), 'vrchat_cookies.json')
-    try:
-        cookies = {
-            cookie.name: cookie.value
-            for cookie in api_client.rest_client.cookie_jar
-            if cookie.domain == "api.vrchat.cloud"
-        }
-        with open(cookie_file, 'w') as f:
-            json.dump(cookies, f)
-        return True
-    except Exception as e:
-        print(f"[!] Error saving cookies: {str(e)}")
-        return False
-
-def login():
-    while True:
-        try:
-            print("\nVRChat Login")
-            print("============")
-            username = input("Enter your VRChat username/email: ")
-            password = input("Enter your VRChat password: ")
-
-            configuration = vrchatapi.Configuration(
-                username=username,
-                password=password
-            )
+# Modules shared with the block and privacy tools live in shared/ at the top of the repository
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir, 'shared'))
 
-            api_client = vrchatapi.ApiClient(configuration)
-            api_client.user_agent = "AvatarInfoFetcher/1.0.0"
-            
-            # Try loading cookies first
-            if load_cookies(api_client):
-                print("\n[✓] Loaded saved cookies - attempting session reuse")
-            
-            auth_api = authentication_api.AuthenticationApi(api_client)
+import json
+import metrics
+import argparse
+import atexit
+import signal
+from vrchatapi.api import avatars_api
+from vrchatapi.exceptions import ApiException
+import time
+from api_executor import ApiExecutor
+from avatar_cache import AvatarCache, NegativeCache
+from avatar_id_reader import AvatarIdReader, BloomFilter, load_offset, save_offset
+from avatar_server import AvatarLookupService, serve
+from discord_dispatcher import DiscordDispatcher
+from fingerprint_store import FingerprintStore
+from http_session import PooledSession
+from metrics import MetricsExporter
+from processed_store import ProcessedStore
+from result_sink import ResultSink
+from run_journal import RunJournal
+from rate_limiter import AdaptiveRateLimiter
+from vrchat_session import start_session
 
-            try:
-                current_user = auth_api.get_current_user()
-                print(f"\nLogged in as: {current_user.display_name}")
-                save_cookies(api_client)  # Save cookies after successful login
-                return api_client
-
-            except UnauthorizedException as e:
-                if "2 Factor Authentication" in str(e) or "Email 2 Factor Authentication" in str(e):
-                    code = input("2FA Code: ")
-                    if "Email" in str(e):
-                        auth_api.verify2_fa_email_code({"code": code})
-                    else:
-                        auth_api.verify2_fa({"code": code})
-                    current_user = auth_api.get_current_user()
-                    print(f"\nLogged in as: {current_user.display_name}")
-                    save_cookies(api_client)  # Save cookies after successful 2FA
-                    return api_client
-                else:
-                    print(f"\nError: {str(e)}")
-
-        except ApiException as e:
-            print(f"\nError during login: {str(e)}")
-            
-        retry = input("\nWould you like to try again? (y/n): ")
-        if retry.lower() != 'y':
-            sys.exit(1)
-
-def read_avatar_ids(filename):
-    try:
-        with open(filename, 'r') as f:
-            avatar_ids = [line.strip() for line in f if line.strip()]
-            if not avatar_ids:
-                print(f"Warning: {filename} is empty")
-                print("Please add avatar IDs (one per line)")
-                sys.exit(1)
-            return avatar_ids
-    except FileNotFoundError:
+def login(interactive=None):
+    """Start a VRChat session, reusing the shared saved session before asking for credentials"""
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    api_client, _ = start_session(
+        "AvatarInfoFetcher/1.0.0",
+        secrets_file=os.path.join(base_dir, 'vrchat_secrets.json'),
+        legacy_cookie_file=os.path.join(base_dir, 'vrchat_cookies.json'),
+        interactive=interactive
+    )
+    return api_client
+
+def read_avatar_ids(filename, start_offset=0, **reader_options):
+    """Open the ID list for streaming, creating it if it doesn't exist"""
+    if not os.path.exists(filename):
         print(f"Error: {filename} not found in script directory")
         print("Creating empty file...")
         with open(filename, 'w') as f:
             f.write("# Add avatar IDs here, one per line\n")
         print(f"Created {filename} - please add avatar IDs and run again")
         sys.exit(1)
+    if start_offset:
+        print(f"Resuming {filename} from byte offset {start_offset}")
+    return AvatarIdReader(filename, start_offset, **reader_options)
+
+_processed_store = None
+
+def get_processed_store():
+    """Load the processed log index once per run"""
+    global _processed_store
+    if _processed_store is None:
+        check_file = os.path.join(os.path.dirname(__file__), 'discord_avatar_check.txt')
+        _processed_store = ProcessedStore(check_file)
+        atexit.register(_processed_store.close)  # Flush buffered IDs on exit or Ctrl-C
+    return _processed_store
 
 def is_avatar_processed(avatar_id):
     """Check if avatar ID exists in processed log file"""
-    check_file = os.path.join(os.path.dirname(__file__), 'discord_avatar_check.txt')
-    if not os.path.exists(check_file):
-        return False
-    with open(check_file, 'r') as f:
-        return avatar_id in [line.strip() for line in f if line.strip() and not line.startswith('#')]
+    with metrics.timer('processed_lookup_duration_seconds'):
+        processed = avatar_id in get_processed_store()
+    metrics.inc('cache_lookups_total', cache='processed', result='hit' if processed else 'miss')
+    return processed
 
 def log_processed_avatar(avatar_id):
     """Add avatar ID to processed log file"""
-    check_file = os.path.join(os.path.dirname(__file__), 'discord_avatar_check.txt')
-    with open(check_file, 'a') as f:
-        f.write(f"{avatar_id}\n")
+    get_processed_store().add(avatar_id)
+
+def on_discord_delivered(avatar_id, journal=None, mark_processed=True, fingerprints=None):
+    """Discord delivery callback, runs once every webhook accepted (or gave up on) the avatar
+
+    Successful avatars are logged as processed; errors are only journaled.
+    In watch mode a failed delivery drops the avatar's fingerprint instead,
+    so the next pass reports it again.
+    """
+    def on_done(all_ok):
+        if not all_ok:
+            if fingerprints:
+                fingerprints.forget(avatar_id)
+            print(f"[!] Discord delivery failed for {avatar_id} - it will be sent again next run")
+            return
+        if mark_processed:
+            log_processed_avatar(avatar_id)
+        if journal:
+            journal.record(avatar_id, 'delivered')
+    return on_done
+
+def normalize_avatar(avatar_id, avatar):
+    """Build the result dict used for printing, logging, caching and Discord"""
+    # Determine platform availability
+    platforms = []
+    if hasattr(avatar, 'unity_packages') and avatar.unity_packages:
+        for package in avatar.unity_packages:
+            if hasattr(package, 'platform'):
+                if package.platform == "standalonewindows":
+                    platforms.append("PC")
+                elif package.platform == "android":
+                    platforms.append("Quest")
+    
+    platform_status = "PC & Quest" if len(platforms) > 1 else platforms[0] if platforms else "Unknown"
+    
+    return {
+        'id': avatar_id,
+        'name': avatar.name if hasattr(avatar, 'name') and avatar.name else "Unknown Name",
+        'author_name': avatar.author_name if hasattr(avatar, 'author_name') else "Unknown Author",
+        'release_status': avatar.release_status if hasattr(avatar, 'release_status') else "Unknown Status",
+        'description': getattr(avatar, 'description', None) or "No description",
+        'image_url': getattr(avatar, 'image_url', None),
+        'thumbnail_url': getattr(avatar, 'thumbnail_image_url', None),
+        'platform': platform_status,
+        'status': 'success'
+    }
+
+def handle_avatar_error(avatar_id, error_msg, discord_dispatcher=None, negative_cache=None, journal=None,
+                        fingerprints=None):
+    """Record a not found/private/invalid avatar and notify Discord if its status changed"""
+    changed = negative_cache.record(avatar_id, error_msg) if negative_cache else True
+    result = {
+        'id': avatar_id,
+        'status': 'error',
+        'error': error_msg
+    }
+    if fingerprints is not None:
+        # In watch mode the fingerprint decides: after a failed delivery it
+        # was dropped, while the negative cache still has the same error
+        if not fingerprints.update(avatar_id, result):
+            return {'id': avatar_id, 'status': 'unchanged'}
+        changed = True
+    notify = bool(discord_dispatcher) and changed
+    if journal:
+        journal.record(avatar_id, 'fetched', result=result, notify=notify)
+    if discord_dispatcher:
+        if changed:
+            print(f"\nQueued error for {len(discord_dispatcher)} Discord webhooks...")
+            discord_dispatcher.submit(result, on_done=on_discord_delivered(
+                avatar_id, journal, mark_processed=False, fingerprints=fingerprints
+            ))
+        else:
+            print(f"\nAvatar {avatar_id} status unchanged - not sending error to Discord again")
+    return result
 
-def get_avatar_info(avatars_api_instance, avatar_id, discord_webhooks=None, rate_limit_delay=5):
+def resume_avatar(avatar_id, entry, discord_dispatcher=None, journal=None):
+    """Finish an avatar from an interrupted run's journal without calling the API
+
+    Returns the journaled result if it still had to be logged, otherwise None.
+    """
+    result = entry['result']
+    if 'delivered' in entry['states'] and result.get('status') == 'success':
+        # The processed log is buffered, so a crash can lose IDs the journal
+        # already has as delivered; adding one again is a no-op
+        log_processed_avatar(avatar_id)
+    if entry['notify'] and 'delivered' not in entry['states'] and discord_dispatcher:
+        print(f"\nAvatar {avatar_id} was fetched before the interruption - resending to Discord")
+        discord_dispatcher.submit(result, on_done=on_discord_delivered(
+            avatar_id, journal, mark_processed=result.get('status') == 'success'
+        ))
+    if 'logged' in entry['states']:
+        return None
+    return result
+
+def skip_avatar(avatar_id, refresh=False, negative_cache=None, skip_processed=True):
+    """Result for an avatar that needs no API call at all (already processed or recently failed), otherwise None"""
     # Skip API call if already processed
-    if is_avatar_processed(avatar_id):
+    if skip_processed and is_avatar_processed(avatar_id):
         print(f"\nAvatar {avatar_id} already processed - skipping API call")
         return {
             'id': avatar_id,
@@ -154,268 +175,571 @@ def get_avatar_info(avatars_api_instance, avatar_id, discord_webhooks=None, rate
             'message': 'Already sent to Discord'
         }
         
+    # Known dead/private avatars are only re-checked on their back-off schedule
+    if negative_cache and not refresh:
+        cached_error = negative_cache.get(avatar_id)
+        if cached_error:
+            print(f"\nAvatar {avatar_id} recently failed - skipping API call until its next re-check")
+            return {
+                'id': avatar_id,
+                'status': 'error',
+                'error': cached_error
+            }
+    return None
+
+def deliver_avatar_info(avatar_id, result, discord_dispatcher=None, journal=None, fingerprints=None):
+    """Journal a fetched or cached avatar and queue it for Discord
+
+    Watch mode (fingerprints given) doesn't use the processed log.
+    """
+    if journal:
+        journal.record(avatar_id, 'fetched', result=result, notify=bool(discord_dispatcher))
+    if discord_dispatcher:
+        # Delivery happens on the dispatcher's threads; the avatar is only
+        # marked as processed once the message carrying it was delivered
+        print(f"\nQueued for {len(discord_dispatcher)} Discord webhooks...")
+        discord_dispatcher.submit(result, on_done=on_discord_delivered(
+            avatar_id, journal, mark_processed=fingerprints is None, fingerprints=fingerprints
+        ))
+    return result
+
+def temporary_error(avatar_id, error_msg):
+    """Result for an avatar that couldn't be checked right now, without counting it as missing"""
+    print(f"\n[!] {error_msg}")
+    return {
+        'id': avatar_id,
+        'status': 'error',
+        'error': error_msg,
+        'temporary': True
+    }
+
+def avatar_info_from_api(avatar_id, fetch, discord_dispatcher=None, avatar_cache=None,
+                         negative_cache=None, journal=None, fingerprints=None):
+    """Turn a get_avatar call into a result
+
+    fetch returns the avatar or raises what get_avatar raised, so it can be
+    the call itself or ApiCall.result of one that ran on the pool. With a
+    FingerprintStore, avatars that look the same as last time are neither
+    journaled nor sent and come back as status 'unchanged'.
+    """
     try:
-        avatar = avatars_api_instance.get_avatar(avatar_id)
-        
-        # Determine platform availability
-        platforms = []
-        if hasattr(avatar, 'unity_packages') and avatar.unity_packages:
-            for package in avatar.unity_packages:
-                if hasattr(package, 'platform'):
-                    if package.platform == "standalonewindows":
-                        platforms.append("PC")
-                    elif package.platform == "android":
-                        platforms.append("Quest")
-        
-        platform_status = "PC & Quest" if len(platforms) > 1 else platforms[0] if platforms else "Unknown"
-        
-        result = {
-            'id': avatar_id,
-            'name': avatar.name if hasattr(avatar, 'name') and avatar.name else "Unknown Name",
-            'author_name': avatar.author_name if hasattr(avatar, 'author_name') else "Unknown Author",
-            'release_status': avatar.release_status if hasattr(avatar, 'release_status') else "Unknown Status",
-            'description': getattr(avatar, 'description', None) or "No description",
-            'image_url': getattr(avatar, 'image_url', None),
-            'thumbnail_url': getattr(avatar, 'thumbnail_image_url', None),
-            'platform': platform_status,
-            'status': 'success'
-        }
-        
-        if discord_webhooks and not is_avatar_processed(avatar_id):
-            print(f"\nSending to {len(discord_webhooks)} Discord webhooks...")
-            for webhook in discord_webhooks:
-                success = send_to_discord(result, webhook)
-                if not success:
-                    print(f"[!] Failed to send to webhook: {webhook[:60]}...")
-                if len(discord_webhooks) > 1:
-                    time.sleep(rate_limit_delay)  # Delay between webhook sends
-            
-        # Log successful processing
-        if discord_webhooks:
-            log_processed_avatar(avatar_id)
-        return result
+        result = normalize_avatar(avatar_id, fetch())
+        if avatar_cache:
+            avatar_cache.put(avatar_id, result)
+        if negative_cache and negative_cache.clear(avatar_id):
+            print(f"\n[✓] Avatar {avatar_id} is available again")
+        if fingerprints is not None and not fingerprints.update(avatar_id, result):
+            return {'id': avatar_id, 'status': 'unchanged'}
+        return deliver_avatar_info(avatar_id, result, discord_dispatcher, journal, fingerprints)
 
     except ValueError as ve:
         if "Invalid value for `name`" in str(ve):
             error_msg = f"Avatar {avatar_id} has invalid or missing name"
             print(f"\n[!] {error_msg}")
-            if discord_webhooks:
-                print(f"\nSending error to {len(discord_webhooks)} Discord webhooks...")
-                for webhook in discord_webhooks:
-                    success = send_to_discord({
-                        'id': avatar_id,
-                        'status': 'error',
-                        'error': error_msg
-                    }, webhook)
-                    if not success:
-                        print(f"Failed to send error to webhook: {webhook}")
-            return {
-                'id': avatar_id,
-                'status': 'error',
-                'error': error_msg
-            }
+            return handle_avatar_error(avatar_id, error_msg, discord_dispatcher, negative_cache, journal,
+                                       fingerprints)
         raise  # Re-raise other ValueError exceptions
         
+    except TimeoutError as e:
+        # The executor gave up waiting on the call, which says nothing about the avatar either
+        return temporary_error(avatar_id, f"{e} for avatar {avatar_id} - try again later")
+
     except ApiException as e:
+        if e.status == 429 or (e.status or 0) >= 500:
+            # Throttling and server errors say nothing about the avatar itself,
+            # so don't report it as missing and don't mark it as processed
+            return temporary_error(
+                avatar_id, f"Temporary VRChat error (HTTP {e.status}) for avatar {avatar_id} - try again later"
+            )
+
         error_msg = f"Avatar {avatar_id} not found or private"
-        if discord_webhooks:
-            print(f"\nSending error to {len(discord_webhooks)} Discord webhooks...")
-            for webhook in discord_webhooks:
-                success = send_to_discord({
-                'id': avatar_id,
-                'status': 'error',
-                'error': error_msg
-                }, webhook)
-                if not success:
-                    print(f"Failed to send error to webhook: {webhook}")
-        return {
-            'id': avatar_id,
-            'status': 'error',
-            'error': error_msg
-        }
+        return handle_avatar_error(avatar_id, error_msg, discord_dispatcher, negative_cache, journal,
+                                   fingerprints)
 
-def send_to_discord(data, webhook_url):
-    # Validate webhook URL format
-    if not webhook_url.startswith('https://discord.com/api/webhooks/'):
-        print(f"[!] DISCORD ERROR: Invalid webhook URL format")
-        return False
-    
-    # Check if webhook URL contains required components
-    parts = webhook_url.split('/')
-    if len(parts) < 7 or not parts[5].isnumeric() or len(parts[6]) < 30:
-        print(f"[!] DISCORD ERROR: Malformed webhook URL")
-        return False
-    
-    embed = {
-        "title": f"Avatar Info: {data.get('id', 'Unknown')}",
-        "color": 0x00ff00 if data.get('status') == 'success' else 0xff0000
-    }
-    
-    if data.get('status') == 'success':
-        embed["fields"] = [
-            {"name": "Name", "value": data['name'], "inline": True},
-            {"name": "Author", "value": data['author_name'], "inline": True},
-            {"name": "Status", "value": data['release_status'], "inline": True},
-            {"name": "Platform", "value": data['platform'], "inline": True},
-            {"name": "Description", "value": data['description'], "inline": False}
-        ]
-        if data.get('image_url'):
-            embed["image"] = {"url": data['image_url']}
+def cached_avatar_info(avatar_id, discord_dispatcher=None, avatar_cache=None, journal=None):
+    """The avatar from the cache, journaled and queued like a fetched one, or None"""
+    result = avatar_cache.get(avatar_id) if avatar_cache else None
+    if result is None:
+        return None
+    print(f"\nAvatar {avatar_id} found in cache - skipping API call")
+    return deliver_avatar_info(avatar_id, result, discord_dispatcher, journal)
+
+def get_avatar_info(avatars_api_instance, avatar_id, discord_dispatcher=None, avatar_cache=None,
+                    refresh=False, negative_cache=None, journal=None, skip_processed=True):
+    """Look up one avatar, blocking until the API call (if any) is done"""
+    result = skip_avatar(avatar_id, refresh, negative_cache, skip_processed)
+    if result is None and not refresh:
+        result = cached_avatar_info(avatar_id, discord_dispatcher, avatar_cache, journal)
+    if result is None:
+        result = avatar_info_from_api(avatar_id, lambda: avatars_api_instance.get_avatar(avatar_id),
+                                      discord_dispatcher, avatar_cache, negative_cache, journal)
+    return result
+
+def report_avatar_info(info, result_sink=None):
+    """Print an avatar result and append it to the result log"""
+    if isinstance(info, dict):
+        print("\n" + "="*50)
+        print(f"Avatar id:{info['id']}")
+        
+        if info.get('status') == 'error':
+            print(f"Error: {info.get('error', 'Unknown error')}")
+            print("="*50)
+            if result_sink:
+                result_sink.write(info)
+        elif info.get('status') != 'processed':
+            try:
+                print(f"Avatar Name: {info['name']}")
+                print(f"Author: {info['author_name']}")
+                print(f"Status: {info['release_status']}")
+                print(f"Platform: {info['platform']}")
+                print(f"Description: {info['description']}")
+                if info.get('image_url'):
+                    print(f"Image URL: {info['image_url']}")
+                if info.get('thumbnail_url'):
+                    print(f"Thumbnail URL: {info['thumbnail_url']}")
+                print("="*50)
+                
+                # One JSON line per avatar on the run's shared, buffered handle
+                if result_sink:
+                    result_sink.write(info)
+            except KeyError as e:
+                print(f"Error: Missing field {e} in avatar info")
+                print("="*50)
     else:
-        embed["description"] = data.get('error', 'Unknown error')
-    
-    payload = {
-        "embeds": [embed]
-    }
-    
-    max_retries = 3
-    attempt = 1
-    
-    while attempt <= max_retries:
+        print(f"\n[!] {info}")
+
+def report_and_journal(info, journal, result_sink=None):
+    """Report a finished avatar and mark it as logged in the run journal"""
+    report_avatar_info(info, result_sink)
+    if isinstance(info, dict) and info.get('status') in ('success', 'error'):
+        journal.record(info['id'], 'logged')
+
+class Runtime:
+    """Everything a fetch pass needs, kept alive between passes in daemon mode"""
+
+    def __init__(self, avatars_api_instance, max_workers, discord_dispatcher, avatar_cache,
+                 negative_cache, journal, result_sink):
+        self.avatars_api_instance = avatars_api_instance
+        self.max_workers = max_workers
+        self.discord_dispatcher = discord_dispatcher
+        self.avatar_cache = avatar_cache
+        self.negative_cache = negative_cache
+        self.journal = journal
+        self.result_sink = result_sink
+        # get_avatar calls run on the API client's own thread pool
+        self.api_executor = ApiExecutor(avatars_api_instance.api_client, max_workers)
+
+    def set_workers(self, max_workers):
+        """Use a differently sized pool from the next pass on"""
+        self.api_executor.resize(max_workers)
+        self.max_workers = max_workers
+
+    def close(self):
+        self.api_executor.close()
+        if self.discord_dispatcher:
+            print("\nWaiting for queued Discord messages to be delivered...")
+            self.discord_dispatcher.close()
+        
+        self.journal.close()
+        self.result_sink.close()
+        print(f"\n[Results] {self.result_sink.written} avatars written to {self.result_sink.path}")
+        
+        if self.avatar_cache:
+            print(f"\n[Cache] {self.avatar_cache.hits} hits, {self.avatar_cache.misses} misses")
+            self.avatar_cache.close()
+        if self.negative_cache:
+            print(f"[Cache] {self.negative_cache.skipped} failed avatars skipped until their next re-check")
+            self.negative_cache.close()
+
+def load_config(config_path):
+    """Read config.json, returns None after explaining the problem if it is missing or invalid"""
+    try:
+        with open(config_path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        print("\n[!] ERROR: config.json not found!")
+        print("Please create the config file with required settings")
+    except json.JSONDecodeError:
+        print("\n[!] ERROR: Invalid config.json format!")
+        print("Please check the file is valid JSON")
+    return None
+
+def discord_webhooks_from_config(config):
+    """Webhooks to post to ([] when Discord is disabled), or None if it is enabled without any"""
+    discord_config = config.get('discord', {})
+    if not discord_config.get('enabled', False):
+        return []
+    webhooks = discord_config.get('webhooks', [])
+    if not webhooks:
+        print("\n[!] ERROR: Discord is enabled but no webhooks configured!")
+        print("Please add webhook URLs to config.json or set 'enabled': false")
+        return None
+    return webhooks
+
+def build_dispatcher(discord_config, discord_webhooks):
+    """Webhooks are served by their own threads so Discord never stalls the fetch loop"""
+    if not discord_webhooks:
+        return None
+    print("\n[✓] Discord webhooks configured:")
+    for i, url in enumerate(discord_webhooks, 1):
+        print(f"  {i}. {url[:60]}...")
+    return DiscordDispatcher(
+        discord_webhooks,
+        max_retries=discord_config.get('max_retries', 3),
+        batch_size=discord_config.get('batch_size', 1),
+        batch_interval=discord_config.get('batch_interval', 2.0),
+        session=PooledSession.from_config(discord_config, workers=len(discord_webhooks))
+    )
+
+def finish_avatar_call(runtime, call):
+    """Report and journal an avatar whose get_avatar call came back from the pool"""
+    avatar_id = call.tag[0]
+    info = avatar_info_from_api(avatar_id, call.result, runtime.discord_dispatcher, runtime.avatar_cache,
+                                runtime.negative_cache, runtime.journal)
+    report_and_journal(info, runtime.journal, runtime.result_sink)
+
+def finish_resumed(runtime, unfinished, finished):
+    """Finish every avatar an interrupted run already fetched, straight from its journal
+
+    This doesn't go through the ID reader: the saved offset moves past an
+    avatar once it is fetched, so a run resumed from that offset would
+    never see avatars whose Discord delivery was still outstanding.
+    Afterwards finished holds every journaled ID and unfinished is empty.
+    """
+    # The processed log is buffered, so a crash can lose IDs the journal
+    # already has as delivered; adding them again is a no-op
+    get_processed_store().add_many(avatar_id for avatar_id, processed in finished.items() if processed)
+    for avatar_id, entry in unfinished.items():
+        if entry['result']:
+            info = resume_avatar(avatar_id, entry, runtime.discord_dispatcher, runtime.journal)
+            if info:
+                report_avatar_info(info, runtime.result_sink)
+                runtime.journal.record(avatar_id, 'logged')
+            finished[avatar_id] = False
+    unfinished.clear()
+
+def process_avatar_ids(runtime, avatar_ids, ids_file, refresh=False, resumed=()):
+    """Fetch, report and journal every ID an AvatarIdReader yields, saving the offset as it goes
+
+    Cache lookups, reporting and journaling happen here; only the
+    get_avatar calls run on the pool, up to max_workers at a time with as
+    many again queued, and are finished in the order they complete.
+    """
+    journal = runtime.journal
+    executor = runtime.api_executor
+    for avatar_id in avatar_ids:
+        # Avatars fetched before an interruption were finished by finish_resumed()
+        if avatar_id in resumed:
+            continue
+
+        # Already processed avatars never touch the API or the rate limiter
+        if is_avatar_processed(avatar_id):
+            report_avatar_info(skip_avatar(avatar_id))
+            continue
+
+        print(f"\nFetching information for avatar: {avatar_id}")
+        info = skip_avatar(avatar_id, refresh, runtime.negative_cache, skip_processed=False)
+        if info is None and not refresh:
+            info = cached_avatar_info(avatar_id, runtime.discord_dispatcher, runtime.avatar_cache, journal)
+        if info is not None:
+            report_and_journal(info, journal, runtime.result_sink)
+            continue
+
+        # Keep a bounded number of avatars in flight
+        if executor.pending >= runtime.max_workers * 2:
+            finish_avatar_call(runtime, executor.next_completed())
+            # Everything before the oldest unfinished line is done
+            save_offset(ids_file, min((call.tag[1] for call in executor.pending_calls()), default=avatar_ids.offset))
+
+        executor.submit(runtime.avatars_api_instance.get_avatar, avatar_id,
+                        tag=(avatar_id, avatar_ids.line_offset))
+
+    for call in executor.as_completed():
+        finish_avatar_call(runtime, call)
+    save_offset(ids_file, avatar_ids.offset)
+
+def reload_config(runtime, rate_limiter, config_path, discord_settings):
+    """Apply an edited config.json to a running daemon
+
+    Rate limits, worker count and Discord settings take effect right away;
+    cache and result file settings are only read at startup. Returns the
+    Discord settings now in use.
+    """
+    config = load_config(config_path)
+    if config is None:
+        print("[!] Keeping the previous configuration")
+        return discord_settings
+    vrchat_config = config.get('vrchat', {})
+    rate_limiter.reconfigure(vrchat_config)
+    runtime.set_workers(max(1, vrchat_config.get('max_workers', 4)))
+
+    discord_config = config.get('discord', {})
+    discord_webhooks = discord_webhooks_from_config(config)
+    if discord_webhooks is None:
+        print("[!] Keeping the previous Discord settings")
+    elif (discord_config, discord_webhooks) != discord_settings:
+        # Deliver what the old dispatcher still holds before switching
+        if runtime.discord_dispatcher:
+            runtime.discord_dispatcher.close()
+        runtime.discord_dispatcher = build_dispatcher(discord_config, discord_webhooks)
+        discord_settings = (discord_config, discord_webhooks)
+
+    avatar_bucket = rate_limiter.bucket('avatars')
+    print(f"\n[✓] Reloaded config.json - {runtime.max_workers} workers at {avatar_bucket.rate:g} requests/second")
+    return discord_settings
+
+def run_daemon(runtime, rate_limiter, ids_file, start_offset, seen, config_path, discord_settings,
+               poll_interval=2.0, refresh=False):
+    """Keep running and process avatar IDs as they are appended to the ID file
+
+    The file is polled every poll_interval seconds from the last byte
+    offset, so only new complete lines are read. The login, worker pool and
+    Discord connections stay open the whole time, and config.json is
+    reloaded whenever it changes. seen is shared with the first pass so
+    IDs listed twice are still only fetched once.
+    """
+    offset = start_offset
+    config_mtime = os.path.getmtime(config_path)
+    print(f"\n[Daemon] Watching {ids_file} for new avatar IDs every {poll_interval:g}s (Ctrl-C to stop)")
+    while True:
         try:
-            print(f"\n[Discord] Sending to webhook (attempt {attempt}/{max_retries})...")
-            response = requests.post(
-                webhook_url,
-                json=payload,
-                headers={'Content-Type': 'application/json'},
-                timeout=10
-            )
-            
-            if response.status_code == 204:
-                print("[✓] Discord webhook sent successfully")
-                return True
-            elif response.status_code == 429:
-                retry_after = response.json().get('retry_after', 5)
-                print(f"[!] RATE LIMITED: Waiting {retry_after} seconds before retry...")
-                time.sleep(retry_after)
-                attempt += 1
-                continue
-            else:
-                print(f"[!] Discord error (HTTP {response.status_code}): {response.text}")
-                return False
-                
-        except requests.exceptions.RequestException as e:
-            print(f"[!] Discord connection error: {str(e)}")
-            return False
-    
-    print("[!] Failed to send to Discord after maximum retries")
-    return False
+            mtime = os.path.getmtime(config_path)
+            if mtime != config_mtime:
+                config_mtime = mtime
+                discord_settings = reload_config(runtime, rate_limiter, config_path, discord_settings)
+            size = os.path.getsize(ids_file)
+        except FileNotFoundError:
+            metrics.sleep(poll_interval, 'daemon_poll')
+            continue
+
+        if size < offset:
+            print(f"\n[Daemon] {ids_file} got shorter - reading it again from the start")
+            offset = 0
+        if size > offset:
+            avatar_ids = AvatarIdReader(ids_file, offset, seen=seen, complete_lines_only=True)
+            process_avatar_ids(runtime, avatar_ids, ids_file, refresh=refresh)
+            offset = avatar_ids.offset
+            if avatar_ids.stats['ids']:
+                print(f"\n[Daemon] {avatar_ids.stats['ids']} new avatar IDs processed, waiting for more...")
+        metrics.sleep(poll_interval, 'daemon_poll')
+
+def finish_watched_call(runtime, fingerprints, call):
+    """Report and journal a watched avatar, but only if its fingerprint changed"""
+    info = avatar_info_from_api(call.tag, call.result, runtime.discord_dispatcher, runtime.avatar_cache,
+                                runtime.negative_cache, runtime.journal, fingerprints)
+    if info.get('status') != 'unchanged':
+        report_and_journal(info, runtime.journal, runtime.result_sink)
+
+def watch_pass(runtime, fingerprints, ids_file):
+    """Fetch every avatar in the ID file once, returns (checked, changed, skipped)
+
+    Always asks the API (the avatar cache is only updated), but only
+    avatars whose fingerprint changed are printed, logged, journaled and
+    sent to Discord. Failed avatars keep their negative cache back-off.
+    """
+    executor = runtime.api_executor
+    avatar_ids = AvatarIdReader(ids_file, complete_lines_only=True)
+    changed_before = fingerprints.changed
+    skipped = 0
+    for avatar_id in avatar_ids:
+        if runtime.negative_cache and runtime.negative_cache.get(avatar_id):
+            skipped += 1
+            continue
+        # Keep a bounded number of avatars in flight
+        if executor.pending >= runtime.max_workers * 2:
+            finish_watched_call(runtime, fingerprints, executor.next_completed())
+        executor.submit(runtime.avatars_api_instance.get_avatar, avatar_id, tag=avatar_id)
+
+    for call in executor.as_completed():
+        finish_watched_call(runtime, fingerprints, call)
+    fingerprints.flush()
+    return avatar_ids.stats['ids'], fingerprints.changed - changed_before, skipped
+
+def run_watch(runtime, rate_limiter, fingerprints, ids_file, config_path, discord_settings, interval):
+    """Check the whole ID file for changed avatars every interval seconds until stopped
+
+    The first pass reports every avatar that has no fingerprint yet, later
+    passes only the ones whose name, release status, platforms, image or
+    availability changed. config.json is reloaded like in daemon mode.
+    """
+    config_mtime = os.path.getmtime(config_path)
+    print(f"\n[Watch] Checking every avatar in {ids_file} for changes every {interval:g}s (Ctrl-C to stop)")
+    while True:
+        started = time.monotonic()
+        mtime = os.path.getmtime(config_path)
+        if mtime != config_mtime:
+            config_mtime = mtime
+            discord_settings = reload_config(runtime, rate_limiter, config_path, discord_settings)
+        if os.path.exists(ids_file):
+            checked, changed, skipped = watch_pass(runtime, fingerprints, ids_file)
+            print(f"\n[Watch] {checked} avatars checked in {time.monotonic() - started:.1f}s - "
+                  f"{changed} changed, {skipped} waiting for their re-check")
+        # Passes start every interval seconds; a pass that took longer is followed right away
+        metrics.sleep(max(0.0, interval - (time.monotonic() - started)), 'watch_poll')
+
+def run_server(avatars_api_instance, max_workers, avatar_cache, negative_cache, host, port):
+    """Answer avatar lookups over HTTP with the logged in client until Ctrl-C
+
+    Lookups come from the avatar cache when possible and otherwise go
+    through the same rate limited client as a normal run. Nothing is sent
+    to Discord or marked as processed.
+    """
+    def fetch(avatar_id, refresh):
+        return get_avatar_info(avatars_api_instance, avatar_id, avatar_cache=avatar_cache, refresh=refresh,
+                               negative_cache=negative_cache, skip_processed=False)
+
+    try:
+        serve(AvatarLookupService(fetch, workers=max_workers), host, port)
+    finally:
+        if avatar_cache:
+            print(f"\n[Cache] {avatar_cache.hits} hits, {avatar_cache.misses} misses")
+            avatar_cache.close()
+        if negative_cache:
+            negative_cache.close()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Fetch VRChat avatar information")
+    parser.add_argument('--refresh', action='store_true',
+                        help="ignore cached avatar data and fetch every avatar from the API again")
+    parser.add_argument('--start-offset', type=int, default=None, metavar='BYTES',
+                        help="start reading avatar_ids.txt at this byte offset")
+    parser.add_argument('--resume-offset', action='store_true',
+                        help="start reading avatar_ids.txt where the last run's saved offset points")
+    parser.add_argument('--resume', action='store_true',
+                        help="continue an interrupted run from run_journal.jsonl without repeating API or webhook calls")
+    parser.add_argument('--headless', action='store_true',
+                        help="never prompt; log in from saved cookies, environment variables or vrchat_secrets.json")
+    parser.add_argument('--daemon', action='store_true',
+                        help="keep running and process avatar IDs as they are appended to avatar_ids.txt")
+    parser.add_argument('--poll-interval', type=float, default=2.0, metavar='SECONDS',
+                        help="how often --daemon checks avatar_ids.txt and config.json for changes (default: 2)")
+    parser.add_argument('--watch', action='store_true',
+                        help="keep re-checking every avatar in avatar_ids.txt and only report the ones that changed")
+    parser.add_argument('--watch-interval', type=float, default=None, metavar='SECONDS',
+                        help="seconds between --watch passes (default: 'interval' in the watch section of config.json, or 300)")
+    parser.add_argument('--serve', type=int, default=None, metavar='PORT',
+                        help="run a local HTTP lookup server on this port instead of reading avatar_ids.txt")
+    parser.add_argument('--host', default='127.0.0.1',
+                        help="address --serve listens on (default: 127.0.0.1)")
+    args = parser.parse_args()
+    if sum((args.daemon, args.watch, args.serve is not None)) > 1:
+        parser.error("--daemon, --watch and --serve can't be combined")
+    return args
 
 def main():
+    args = parse_args()
+    
     print("\nVRChat Avatar Information Fetcher")
     print("================================")
     print("Checking configuration...")
     
     # Login
-    api_client = login()
+    api_client = login(interactive=False if args.headless else None)
     avatars_api_instance = avatars_api.AvatarsApi(api_client)
     
-    # Read avatar IDs
-    avatar_ids = read_avatar_ids('avatar_ids.txt')
+    # Stream avatar IDs (validated, de-duplicated, optionally from a saved offset)
+    ids_file = 'avatar_ids.txt'
+    start_offset = args.start_offset or 0
+    if args.resume_offset or (args.daemon and args.start_offset is None):
+        start_offset = load_offset(ids_file)
+    seen = BloomFilter()
+    if args.serve is None:
+        avatar_ids = read_avatar_ids(ids_file, start_offset, seen=seen, complete_lines_only=args.daemon)
     
     # Load and validate configuration
     config_path = os.path.join(os.path.dirname(__file__), 'config.json')
-    discord_webhooks = []
-    discord_enabled = False
-    rate_limit_delay = 5  # Default delay between webhook sends
-    
-    try:
-        with open(config_path) as f:
-            config = json.load(f)
-            
-        # Check Discord configuration
-        discord_config = config.get('discord', {})
-        discord_enabled = discord_config.get('enabled', False)
-        rate_limit_delay = config.get('vrchat', {}).get('rate_limit_delay', 5)
-        
-        if discord_enabled:
-            discord_webhooks = discord_config.get('webhooks', [])
-            if not discord_webhooks:
-                print("\n[!] ERROR: Discord is enabled but no webhooks configured!")
-                print("Please add webhook URLs to config.json or set 'enabled': false")
-                sys.exit(1)
-                
-            print("\n[✓] Discord webhooks configured:")
-            for i, url in enumerate(discord_webhooks, 1):
-                print(f"  {i}. {url[:60]}...")
-                
-    except FileNotFoundError:
-        print("\n[!] ERROR: config.json not found!")
-        print("Please create the config file with required settings")
+    config = load_config(config_path)
+    if config is None:
         sys.exit(1)
-    except json.JSONDecodeError:
-        print("\n[!] ERROR: Invalid config.json format!")
-        print("Please check the file is valid JSON")
+    discord_config = config.get('discord', {})
+    discord_webhooks = discord_webhooks_from_config(config)
+    if discord_webhooks is None:
         sys.exit(1)
+    vrchat_config = config.get('vrchat', {})
+    max_workers = max(1, vrchat_config.get('max_workers', 4))
+    rate_limiter = AdaptiveRateLimiter.from_config(vrchat_config)
+    avatar_cache = AvatarCache.from_config(config.get('cache', {}), os.path.dirname(__file__))
+    negative_cache = NegativeCache.from_config(config.get('cache', {}), os.path.dirname(__file__))
     
-    if not avatar_ids:
-        print("No avatar IDs found in avatar_ids.txt")
-        sys.exit(1)
+    # Latency, status and cache metrics for Prometheus plus a JSON summary at the end
+    metrics_exporter = MetricsExporter.from_config(config.get('metrics', {}), os.path.dirname(__file__))
+    atexit.register(metrics_exporter.close)
+    
+    # Every VRChat call from here on is paced per endpoint family and retried on 429
+    rate_limiter.install(api_client)
+    avatar_bucket = rate_limiter.bucket('avatars')
+    
+    if args.serve is not None:
+        run_server(avatars_api_instance, max_workers, avatar_cache, negative_cache, args.host, args.serve)
+        metrics_exporter.close()
+        return
+    
+    discord_dispatcher = build_dispatcher(discord_config, discord_webhooks)
+    
+    # Journal every avatar's progress so an interrupted run can be resumed
+    journal_path = os.path.join(os.path.dirname(__file__), 'run_journal.jsonl')
+    unfinished, resumed = {}, {}
+    if args.resume:
+        unfinished, resumed = RunJournal.replay(journal_path)
+        print(f"\n[✓] Resuming interrupted run - {len(unfinished) + len(resumed)} avatars already in the journal")
+    journal = RunJournal(journal_path, truncate=not args.resume)
+    atexit.register(journal.close)
+    
+    # Results go to one long-lived JSONL file instead of reopening a log per avatar
+    result_sink = ResultSink.from_config(config.get('results', {}))
+    atexit.register(result_sink.close)
+    
+    runtime = Runtime(avatars_api_instance, max_workers, discord_dispatcher, avatar_cache,
+                      negative_cache, journal, result_sink)
+    
+    # Deliver and log what the interrupted run fetched before reading any new IDs
+    finish_resumed(runtime, unfinished, resumed)
     
     print("\nStarting avatar information fetch...")
+    print(f"Using {max_workers} workers at {avatar_bucket.rate:g} requests/second (burst {avatar_bucket.capacity})")
     
-    for avatar_id in avatar_ids:
-        print(f"\nFetching information for avatar: {avatar_id}")
-        info = get_avatar_info(avatars_api_instance, avatar_id, discord_webhooks, rate_limit_delay)
-        
-        if isinstance(info, dict):
-            print("\n" + "="*50)
-            print(f"Avatar id:{info['id']}")
-            
-            if info.get('status') == 'error':
-                print(f"Error: {info.get('error', 'Unknown error')}")
-                print("="*50)
-            elif info.get('status') != 'processed':
-                try:
-                    print(f"Avatar Name: {info['name']}")
-                    print(f"Author: {info['author_name']}")
-                    print(f"Status: {info['release_status']}")
-                    print(f"Platform: {info['platform']}")
-                    print(f"Description: {info['description']}")
-                    if info.get('image_url'):
-                        print(f"Image URL: {info['image_url']}")
-                    if info.get('thumbnail_url'):
-                        print(f"Thumbnail URL: {info['thumbnail_url']}")
-                    print("="*50)
-                    
-                    # Write to API log file with UTF-8 encoding
-                    try:
-                        with open('api_log.txt', 'a', encoding='utf-8') as log:
-                            log.write("==================================================\n")
-                            log.write(f"Avatar id:{info['id']}\n")
-                            log.write(f"Avatar Name: {info['name']}\n")
-                            log.write(f"Author: {info['author_name']}\n")
-                            log.write(f"Status: {info['release_status']}\n")
-                            log.write(f"Platform: {info['platform']}\n")
-                            log.write(f"Description: {info['description']}\n")
-                            if info.get('image_url'):
-                                log.write(f"Image URL: {info['image_url']}\n")
-                            if info.get('thumbnail_url'):
-                                log.write(f"Thumbnail URL: {info['thumbnail_url']}\n")
-                            log.write("==================================================\n\n")
-                    except UnicodeEncodeError:
-                        # Fallback to ASCII with replacement characters for problematic chars
-                        with open('api_log.txt', 'a', encoding='ascii', errors='replace') as log:
-                            log.write("==================================================\n")
-                            log.write(f"Avatar id:{info['id']}\n")
-                            log.write(f"Avatar Name: {info['name']}\n")
-                            log.write(f"Author: {info['author_name'].encode('ascii', 'replace').decode('ascii')}\n")
-                            log.write(f"Status: {info['release_status']}\n")
-                            log.write(f"Platform: {info['platform']}\n")
-                            log.write(f"Description: {info['description'].encode('ascii', 'replace').decode('ascii')}\n")
-                            if info.get('image_url'):
-                                log.write(f"Image URL: {info['image_url']}\n")
-                            if info.get('thumbnail_url'):
-                                log.write(f"Thumbnail URL: {info['thumbnail_url']}\n")
-                            log.write("==================================================\n\n")
-                except KeyError as e:
-                    print(f"Error: Missing field {e} in avatar info")
-                    print("="*50)
-        else:
-            print(f"\n[!] {info}")
-        
-        # Wait 5 seconds before next avatar
-        time.sleep(5)
+    if args.watch:
+        watch_config = config.get('watch', {})
+        fingerprints = FingerprintStore.from_config(watch_config, os.path.dirname(__file__))
+        interval = args.watch_interval or watch_config.get('interval', 300)
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+        try:
+            run_watch(runtime, rate_limiter, fingerprints, ids_file, config_path,
+                      (discord_config, discord_webhooks), interval)
+        except KeyboardInterrupt:
+            print("\n[Watch] Stopping...")
+        finally:
+            # Deliveries still in flight may drop fingerprints, so the store closes last
+            runtime.close()
+            print(f"[Watch] {len(fingerprints)} avatars fingerprinted, {fingerprints.changed} changes reported")
+            fingerprints.close()
+            metrics_exporter.close()
+        return
+    
+    if args.daemon:
+        # SIGTERM (service stop) shuts down as cleanly as Ctrl-C
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+        try:
+            process_avatar_ids(runtime, avatar_ids, ids_file, args.refresh, resumed)
+            run_daemon(runtime, rate_limiter, ids_file, avatar_ids.offset, seen, config_path,
+                       (discord_config, discord_webhooks), args.poll_interval, args.refresh)
+        except KeyboardInterrupt:
+            print("\n[Daemon] Stopping...")
+        finally:
+            runtime.close()
+            metrics_exporter.close()
+        return
+    
+    process_avatar_ids(runtime, avatar_ids, ids_file, args.refresh, resumed)
+    
+    stats = avatar_ids.stats
+    if not stats['ids']:
+        print(f"\nWarning: no avatar IDs found in {ids_file}")
+        print("Please add avatar IDs (one per line)")
+    print(f"\n[IDs] {stats['ids']} read, {stats['duplicates']} duplicates and {stats['invalid']} invalid lines skipped")
+    
+    runtime.close()
+    metrics_exporter.close()
     
     print("\nCompleted fetching all avatar information.")
     print("Thank you for using Avatar Information Fetcher!")
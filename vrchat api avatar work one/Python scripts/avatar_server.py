@@ -0,0 +1,168 @@
+import json
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from avatar_id_reader import is_valid_avatar_id
+
+MAX_BATCH_SIZE = 100
+MAX_BODY_BYTES = 1024 * 1024
+
+
+class RequestCoalescer:
+    """Lets concurrent callers asking for the same key share one call
+
+    The first caller for a key runs the function, everyone arriving while it
+    is still running waits for the same result (or exception) instead of
+    starting their own call.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.shared = 0
+        self._in_flight = {}  # key -> Future of the running call
+        self._lock = threading.Lock()
+
+    def run(self, key, func):
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is not None:
+                self.shared += 1
+                owner = False
+            else:
+                future = self._in_flight[key] = Future()
+                self.calls += 1
+                owner = True
+        if not owner:
+            return future.result()
+
+        try:
+            future.set_result(func())
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+        return future.result()
+
+
+def http_status(result):
+    """HTTP status code for a get_avatar_info() result"""
+    if result.get('status') == 'success':
+        return 200
+    if result.get('temporary'):
+        return 503
+    return 404
+
+
+class AvatarLookupService:
+    """Avatar lookups for the HTTP server, coalesced per avatar ID
+
+    fetch(avatar_id, refresh) does the actual lookup (cache first, then
+    VRChat through the shared, rate limited client) and must be thread safe.
+    Batches are spread over a pool of workers threads.
+
+    Args:
+        fetch (callable): Returns a get_avatar_info() style result dict
+        workers (int): Lookups of one batch running at the same time
+    """
+
+    def __init__(self, fetch, workers=4):
+        self.fetch = fetch
+        self.coalescer = RequestCoalescer()
+        self.executor = ThreadPoolExecutor(max_workers=max(1, workers))
+
+    def lookup(self, avatar_id, refresh=False):
+        """Return (HTTP status, result) for one avatar"""
+        if not is_valid_avatar_id(avatar_id):
+            return 400, {'id': avatar_id, 'status': 'error', 'error': "Invalid avatar ID"}
+        try:
+            result = self.coalescer.run((avatar_id, refresh), lambda: self.fetch(avatar_id, refresh))
+        except Exception as e:
+            return 502, {'id': avatar_id, 'status': 'error', 'error': f"VRChat request failed: {e}"}
+        return http_status(result), result
+
+    def lookup_many(self, avatar_ids, refresh=False):
+        """Return the results for several avatars, in the order they were asked for"""
+        futures = [self.executor.submit(self.lookup, avatar_id, refresh) for avatar_id in avatar_ids]
+        return [future.result()[1] for future in futures]
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+
+class AvatarRequestHandler(BaseHTTPRequestHandler):
+    """GET /avatar/<id> and POST /avatars ({"ids": [...]}), both accept ?refresh=1"""
+
+    server_version = "AvatarInfoServer/1.0"
+    protocol_version = "HTTP/1.1"  # Keep-alive, every response has a Content-Length
+    disable_nagle_algorithm = True  # Headers and body are separate writes
+
+    @property
+    def service(self):
+        return self.server.service
+
+    def _send_json(self, status, data):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status, message):
+        self.close_connection = True  # A request body may still be unread
+        self._send_json(status, {'status': 'error', 'error': message})
+
+    def _parse_url(self):
+        url = urlsplit(self.path)
+        refresh = parse_qs(url.query).get('refresh', ['0'])[0].lower() in ('1', 'true', 'yes')
+        return url.path.rstrip('/'), refresh
+
+    def do_GET(self):
+        path, refresh = self._parse_url()
+        if not path.startswith('/avatar/'):
+            return self._send_error(404, "Use GET /avatar/<id> or POST /avatars")
+        status, result = self.service.lookup(path[len('/avatar/'):], refresh)
+        self._send_json(status, result)
+
+    def do_POST(self):
+        path, refresh = self._parse_url()
+        if path != '/avatars':
+            return self._send_error(404, "Use GET /avatar/<id> or POST /avatars")
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > MAX_BODY_BYTES:
+            return self._send_error(413, "Request body too large")
+        try:
+            body = json.loads(self.rfile.read(length) or b'null')
+        except ValueError:
+            return self._send_error(400, "Request body must be JSON")
+        avatar_ids = body.get('ids') if isinstance(body, dict) else body
+        if not isinstance(avatar_ids, list) or not all(isinstance(i, str) for i in avatar_ids):
+            return self._send_error(400, 'Expected {"ids": ["avtr_...", ...]}')
+        if len(avatar_ids) > MAX_BATCH_SIZE:
+            return self._send_error(400, f"At most {MAX_BATCH_SIZE} avatar IDs per request")
+        self._send_json(200, {'avatars': self.service.lookup_many(avatar_ids, refresh)})
+
+    def log_message(self, format, *args):
+        print(f"[HTTP] {self.address_string()} - {format % args}")
+
+
+def serve(service, host='127.0.0.1', port=8080):
+    """Serve avatar lookups until Ctrl-C, one thread per connection"""
+    server = ThreadingHTTPServer((host, port), AvatarRequestHandler)
+    server.daemon_threads = True
+    server.service = service
+    print(f"\n[Server] Listening on http://{host}:{server.server_port} (Ctrl-C to stop)")
+    print("  GET  /avatar/<id>")
+    print(f"  POST /avatars  {{\"ids\": [...]}} (up to {MAX_BATCH_SIZE})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n[Server] Stopping...")
+    finally:
+        server.server_close()
+        service.close()
+        coalescer = service.coalescer
+        print(f"[Server] {coalescer.calls} lookups, {coalescer.shared} requests shared an in-flight lookup")
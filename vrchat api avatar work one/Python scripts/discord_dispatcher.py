@@ -0,0 +1,351 @@
+import queue
+import threading
+import time
+
+import requests
+
+import metrics
+from http_session import PooledSession
+
+# Discord accepts at most 10 embeds and 6000 embed characters per message
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_EMBED_CHARS = 6000
+# Per-embed limits; anything longer gets the whole message rejected with HTTP 400
+MAX_TITLE_CHARS = 256
+MAX_DESCRIPTION_CHARS = 4096
+MAX_FIELD_VALUE_CHARS = 1024
+
+
+def is_valid_webhook_url(webhook_url):
+    """Check a Discord webhook URL has the expected shape, printing why if not"""
+    if not webhook_url.startswith('https://discord.com/api/webhooks/'):
+        print(f"[!] DISCORD ERROR: Invalid webhook URL format")
+        return False
+
+    # Check if webhook URL contains required components
+    parts = webhook_url.split('/')
+    if len(parts) < 7 or not parts[5].isnumeric() or len(parts[6]) < 30:
+        print(f"[!] DISCORD ERROR: Malformed webhook URL")
+        return False
+    return True
+
+
+def clip(text, limit):
+    """Cut text down to one of Discord's length limits (empty values aren't allowed either)"""
+    text = str(text) if text is not None else ""
+    if len(text) > limit:
+        return text[:limit - 1] + "…"
+    return text or "-"
+
+
+def build_embed(data):
+    """Build the Discord embed for an avatar result or error"""
+    embed = {
+        "title": clip(f"Avatar Info: {data.get('id', 'Unknown')}", MAX_TITLE_CHARS),
+        "color": 0x00ff00 if data.get('status') == 'success' else 0xff0000
+    }
+
+    if data.get('status') == 'success':
+        embed["fields"] = [
+            {"name": "Name", "value": clip(data['name'], MAX_FIELD_VALUE_CHARS), "inline": True},
+            {"name": "Author", "value": clip(data['author_name'], MAX_FIELD_VALUE_CHARS), "inline": True},
+            {"name": "Status", "value": clip(data['release_status'], MAX_FIELD_VALUE_CHARS), "inline": True},
+            {"name": "Platform", "value": clip(data['platform'], MAX_FIELD_VALUE_CHARS), "inline": True},
+            {"name": "Description", "value": clip(data['description'], MAX_FIELD_VALUE_CHARS), "inline": False}
+        ]
+        if data.get('image_url'):
+            embed["image"] = {"url": data['image_url']}
+    else:
+        embed["description"] = clip(data.get('error', 'Unknown error'), MAX_DESCRIPTION_CHARS)
+    return embed
+
+
+def embed_length(embed):
+    """Characters Discord counts towards the per-message embed limit"""
+    length = len(embed.get("title", "")) + len(embed.get("description", ""))
+    for field in embed.get("fields", []):
+        length += len(str(field["name"])) + len(str(field["value"]))
+    return length
+
+
+class _Delivery:
+    """One message fanned out to every webhook
+
+    Once every webhook finished, each embed's on_done gets whether that
+    embed reached all of them.
+    """
+
+    def __init__(self, items, webhook_count):
+        self.embeds = [embed for embed, _ in items]
+        self.callbacks = [on_done for _, on_done in items]
+        self._remaining = webhook_count
+        self._all_ok = [True] * len(items)
+        self._lock = threading.Lock()
+
+    def finished(self, results):
+        """Record one webhook's per-embed results"""
+        with self._lock:
+            self._all_ok = [ok and success for ok, success in zip(self._all_ok, results)]
+            self._remaining -= 1
+            if self._remaining:
+                return
+        for on_done, all_ok in zip(self.callbacks, self._all_ok):
+            if on_done:
+                on_done(all_ok)
+
+
+class _WebhookWorker(threading.Thread):
+    """Sends queued payloads to a single webhook, pacing on Discord's rate limit headers"""
+
+    def __init__(self, dispatcher, webhook_url, queue_size):
+        super().__init__(daemon=True)
+        self.dispatcher = dispatcher
+        self.webhook_url = webhook_url
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.bucket = None  # X-RateLimit-Bucket, known after the first response
+        self._ready_at = 0.0
+
+    def run(self):
+        while True:
+            delivery = self.queue.get()
+            try:
+                if delivery is None:
+                    return
+                delivery.finished(self._deliver(delivery.embeds))
+            finally:
+                self.queue.task_done()
+
+    def _wait_for_bucket(self):
+        """Sleep until this webhook's bucket (and any global limit) has room"""
+        ready_at = max(self._ready_at, self.dispatcher.ready_at(self.bucket))
+        delay = ready_at - time.monotonic()
+        metrics.sleep(delay, 'discord_rate_limit')
+
+    def _update_bucket(self, headers):
+        """Remember when the bucket resets if this response used its last request"""
+        self.bucket = headers.get('X-RateLimit-Bucket', self.bucket)
+        try:
+            remaining = int(headers.get('X-RateLimit-Remaining', 1))
+            reset_after = float(headers.get('X-RateLimit-Reset-After', 0))
+        except ValueError:
+            return
+        if remaining <= 0 and reset_after > 0:
+            self._ready_at = time.monotonic() + reset_after
+            if self.bucket:
+                self.dispatcher.set_bucket_ready_at(self.bucket, self._ready_at)
+
+    def _deliver(self, embeds):
+        """Send embeds as one message, returns whether each of them was accepted"""
+        if not is_valid_webhook_url(self.webhook_url):
+            return [False] * len(embeds)
+
+        status = self._post({"embeds": embeds})
+        if status == 400 and len(embeds) > 1:
+            # One bad embed gets the whole message rejected; send them one at a
+            # time so the others still arrive and only the bad one fails. Other
+            # errors (deleted or unauthorised webhook) fail every embed anyway
+            print(f"[!] Discord rejected a batch of {len(embeds)} embeds - sending them one at a time")
+            return [self._post({"embeds": [embed]}) in (200, 204) for embed in embeds]
+        return [status in (200, 204)] * len(embeds)
+
+    def _post(self, payload):
+        """Post one message, retrying on 429; returns the final HTTP status, or None on a connection error"""
+        max_retries = self.dispatcher.max_retries
+        attempt = 1
+
+        while attempt <= max_retries:
+            self._wait_for_bucket()
+            started = time.perf_counter()
+            try:
+                print(f"\n[Discord] Sending {len(payload['embeds'])} embed(s) to webhook {self.webhook_url[:60]}... (attempt {attempt}/{max_retries})")
+                response = self.dispatcher.session.post(
+                    self.webhook_url,
+                    json=payload,
+                    headers={'Content-Type': 'application/json'}
+                )
+            except requests.exceptions.RequestException as e:
+                metrics.inc('discord_webhook_requests_total', status='error')
+                print(f"[!] Discord connection error: {str(e)}")
+                return None
+            finally:
+                metrics.observe('discord_webhook_duration_seconds', time.perf_counter() - started)
+            metrics.inc('discord_webhook_requests_total', status=str(response.status_code))
+
+            self._update_bucket(response.headers)
+
+            if response.status_code in (200, 204):
+                reuse = "reused connection" if response.connection_reused else "new connection"
+                print(f"[✓] Discord webhook sent successfully ({reuse})")
+                return response.status_code
+            elif response.status_code == 429:
+                try:
+                    body = response.json()
+                except ValueError:
+                    body = {}
+                retry_after = float(body.get('retry_after') or response.headers.get('Retry-After') or 5)
+                if body.get('global'):
+                    print(f"[!] GLOBAL RATE LIMIT: Pausing all webhooks for {retry_after} seconds...")
+                    self.dispatcher.set_bucket_ready_at(None, time.monotonic() + retry_after)
+                else:
+                    print(f"[!] RATE LIMITED: Waiting {retry_after} seconds before retry...")
+                    self._ready_at = time.monotonic() + retry_after
+                    if self.bucket:
+                        self.dispatcher.set_bucket_ready_at(self.bucket, self._ready_at)
+                metrics.inc('retries_total', service='discord', reason='429')
+                attempt += 1
+                continue
+            else:
+                print(f"[!] Discord error (HTTP {response.status_code}): {response.text}")
+                return response.status_code
+
+        print("[!] Failed to send to Discord after maximum retries")
+        return None
+
+
+class DiscordDispatcher:
+    """Delivers embeds to several webhooks in parallel without blocking the caller
+
+    Each webhook gets its own queue and worker thread. Workers read Discord's
+    X-RateLimit-Remaining / X-RateLimit-Reset-After / X-RateLimit-Bucket
+    headers and wait for the bucket to reset before sending, instead of
+    running into a 429 first.
+
+    With batch_size > 1, embeds are grouped into messages of up to 10 and a
+    message is sent as soon as it is full or its oldest embed has waited
+    batch_interval seconds.
+
+    Args:
+        webhooks (list): Webhook URLs to deliver every message to
+        max_retries (int): Attempts per webhook when rate limited
+        timeout (float): HTTP read timeout, used when no session is given
+        queue_size (int): Pending messages per webhook before submit() blocks
+        batch_size (int): Embeds per message (1-10, 1 disables batching)
+        batch_interval (float): Longest time an embed waits for a batch to fill
+        session (PooledSession): Keep-alive HTTP session for all webhook requests
+    """
+
+    def __init__(self, webhooks, max_retries=3, timeout=10, queue_size=1000,
+                 batch_size=1, batch_interval=2.0, session=None):
+        self.webhooks = list(webhooks)
+        self.max_retries = max_retries
+        self.session = session or PooledSession(pool_size=max(1, len(self.webhooks)), read_timeout=timeout)
+        self.batch_size = max(1, min(MAX_EMBEDS_PER_MESSAGE, int(batch_size)))
+        self.batch_interval = batch_interval
+        self._bucket_ready_at = {}  # bucket id (None = global) -> monotonic time
+        self._lock = threading.Lock()
+        self._workers = [_WebhookWorker(self, url, queue_size) for url in self.webhooks]
+        for worker in self._workers:
+            worker.start()
+
+        self._batch = []  # (embed, on_done) waiting for the next message
+        self._batch_chars = 0
+        self._batch_started = 0.0
+        self._batch_cond = threading.Condition()
+        self._closing = False
+        self._flusher = None
+        if self.batch_size > 1:
+            self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+            self._flusher.start()
+
+    def __len__(self):
+        return len(self.webhooks)
+
+    def ready_at(self, bucket):
+        """Earliest time a request on this bucket may be sent"""
+        with self._lock:
+            return max(self._bucket_ready_at.get(None, 0.0), self._bucket_ready_at.get(bucket, 0.0))
+
+    def set_bucket_ready_at(self, bucket, ready_at):
+        with self._lock:
+            self._bucket_ready_at[bucket] = max(self._bucket_ready_at.get(bucket, 0.0), ready_at)
+
+    def submit(self, data, on_done=None):
+        """Queue an avatar result for every webhook
+
+        on_done(all_ok) is called from a worker thread once this result has
+        been accepted by, or given up on by, every webhook. A batch Discord
+        rejects is resent one embed at a time, so only the bad result fails.
+        """
+        embed = build_embed(data)
+        if self.batch_size == 1:
+            self._send([(embed, on_done)])
+            return
+
+        with self._batch_cond:
+            size = embed_length(embed)
+            if self._batch and self._batch_chars + size > MAX_EMBED_CHARS:
+                self._flush_locked()
+            if not self._batch:
+                self._batch_started = time.monotonic()
+                self._batch_cond.notify()
+            self._batch.append((embed, on_done))
+            self._batch_chars += size
+            if len(self._batch) >= self.batch_size:
+                self._flush_locked()
+
+    def flush(self):
+        """Send the current partial batch now"""
+        with self._batch_cond:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._batch:
+            return
+        items = self._batch
+        self._batch = []
+        self._batch_chars = 0
+        self._send(items)
+
+    def _flush_loop(self):
+        """Send partial batches once their oldest embed reaches batch_interval"""
+        with self._batch_cond:
+            while not self._closing:
+                if not self._batch:
+                    self._batch_cond.wait()
+                    continue
+                remaining = self._batch_started + self.batch_interval - time.monotonic()
+                if remaining <= 0:
+                    self._flush_locked()
+                else:
+                    self._batch_cond.wait(remaining)
+
+    def _send(self, items):
+        if not self._workers:
+            for _, on_done in items:
+                if on_done:
+                    on_done(True)
+            return
+        delivery = _Delivery(items, len(self._workers))
+        for worker in self._workers:
+            worker.queue.put(delivery)
+
+    def join(self):
+        """Send any partial batch and wait until every queued message has been handled"""
+        self.flush()
+        for worker in self._workers:
+            worker.queue.join()
+
+    def close(self):
+        """Deliver everything still queued, then stop the workers"""
+        with self._batch_cond:
+            self._closing = True
+            self._flush_locked()
+            self._batch_cond.notify_all()
+        if self._flusher:
+            self._flusher.join()
+        for worker in self._workers:
+            worker.queue.put(None)
+        for worker in self._workers:
+            worker.join()
+
+        stats = self.session.stats()
+        if stats['requests']:
+            print(f"[Discord] {stats['requests']} requests over {stats['new_connections']} connections "
+                  f"({stats['reuse_ratio']:.0%} reused)")
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,113 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# What counts as a change worth reporting in watch mode; status and error
+# make an avatar that disappears (or comes back) a change too
+FINGERPRINT_FIELDS = ('status', 'error', 'name', 'release_status', 'platform', 'image_url')
+
+
+def fingerprint(result):
+    """64-bit hash of the fields of a normalized result that watch mode reports changes of"""
+    data = json.dumps([result.get(field) for field in FINGERPRINT_FIELDS], ensure_ascii=False)
+    digest = hashlib.blake2b(data.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big', signed=True)  # Fits an SQLite INTEGER
+
+
+class FingerprintStore:
+    """Last reported fingerprint of every watched avatar
+
+    One 8-byte hash per avatar instead of the whole result, so large ID
+    sets stay small on disk. update() stores a result's fingerprint and
+    says whether it differs from the stored one; avatars seen for the first
+    time count as changed.
+
+    Args:
+        path (str): SQLite database file
+    """
+
+    def __init__(self, path, commit_every=500):
+        self.path = path
+        self.commit_every = commit_every
+        self.changed = 0
+        self.unchanged = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS fingerprints ("
+            " avatar_id TEXT PRIMARY KEY,"
+            " fingerprint INTEGER NOT NULL,"
+            " changed_at REAL NOT NULL) WITHOUT ROWID"
+        )
+        self._db.commit()
+
+    @classmethod
+    def from_config(cls, watch_config, base_dir):
+        """Build a store from the 'watch' section of config.json"""
+        path = watch_config.get('fingerprint_file', 'avatar_fingerprints.db')
+        if not os.path.isabs(path):
+            path = os.path.join(base_dir, path)
+        return cls(path)
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM fingerprints").fetchone()[0]
+
+    def get(self, avatar_id):
+        """The stored fingerprint of an avatar, or None if it was never seen"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT fingerprint FROM fingerprints WHERE avatar_id = ?", (avatar_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def update(self, avatar_id, result):
+        """Store the fingerprint of a result, returns True if it changed (or is new)"""
+        new = fingerprint(result)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT fingerprint FROM fingerprints WHERE avatar_id = ?", (avatar_id,)
+            ).fetchone()
+            if row and row[0] == new:
+                self.unchanged += 1
+                return False
+            self._db.execute(
+                "INSERT OR REPLACE INTO fingerprints (avatar_id, fingerprint, changed_at) VALUES (?, ?, ?)",
+                (avatar_id, new, time.time())
+            )
+            self.changed += 1
+            self._wrote()
+            return True
+
+    def forget(self, avatar_id):
+        """Drop an avatar's fingerprint so its next result is reported again"""
+        with self._lock:
+            self._db.execute("DELETE FROM fingerprints WHERE avatar_id = ?", (avatar_id,))
+            self._wrote()
+
+    def flush(self):
+        """Write pending changes to disk"""
+        with self._lock:
+            self._db.commit()
+
+    def _wrote(self):
+        self._writes += 1
+        if self._writes % self.commit_every == 0:
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.commit()
+            self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
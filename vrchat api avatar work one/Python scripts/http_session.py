@@ -0,0 +1,99 @@
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+# Set when the current thread's request had to open a new connection
+_connection_state = threading.local()
+
+
+class _CountingHTTPConnectionPool(HTTPConnectionPool):
+    def _new_conn(self):
+        _connection_state.opened = True
+        return super()._new_conn()
+
+
+class _CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    def _new_conn(self):
+        _connection_state.opened = True
+        return super()._new_conn()
+
+
+class _CountingAdapter(HTTPAdapter):
+    """HTTPAdapter whose pools report when a new TCP/TLS connection is opened"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _CountingHTTPConnectionPool,
+            'https': _CountingHTTPSConnectionPool,
+        }
+
+
+class PooledSession:
+    """Keep-alive requests.Session shared by all webhook traffic
+
+    Connections to discord.com are pooled and reused between messages and
+    retries, so only the first request per connection pays for the TCP and
+    TLS handshake. Every response gets a `connection_reused` attribute and
+    totals are available from stats().
+
+    Args:
+        pool_size (int): Connections kept open per host
+        keep_alive (bool): Reuse connections between requests
+        connect_timeout (float): Seconds to wait for a connection
+        read_timeout (float): Seconds to wait for a response
+    """
+
+    def __init__(self, pool_size=4, keep_alive=True, connect_timeout=5, read_timeout=10):
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = requests.Session()
+        adapter = _CountingAdapter(pool_connections=1, pool_maxsize=max(1, pool_size), max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        if not keep_alive:
+            self.session.headers['Connection'] = 'close'
+        self._requests = 0
+        self._new_connections = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, discord_config, workers=1):
+        """Build a session from the 'discord' section of config.json"""
+        http_config = discord_config.get('http', {})
+        return cls(
+            pool_size=http_config.get('pool_size', max(1, workers)),
+            keep_alive=http_config.get('keep_alive', True),
+            connect_timeout=http_config.get('connect_timeout', 5),
+            read_timeout=http_config.get('read_timeout', discord_config.get('timeout', 10))
+        )
+
+    def post(self, url, **kwargs):
+        """POST through the pool, marking whether an existing connection was reused"""
+        kwargs.setdefault('timeout', self.timeout)
+        _connection_state.opened = False
+        try:
+            response = self.session.post(url, **kwargs)
+        finally:
+            opened = _connection_state.opened
+            with self._lock:
+                self._requests += 1
+                if opened:
+                    self._new_connections += 1
+        response.connection_reused = not opened
+        return response
+
+    def stats(self):
+        """Request and connection totals since the session was created"""
+        with self._lock:
+            reused = self._requests - self._new_connections
+            return {
+                'requests': self._requests,
+                'new_connections': self._new_connections,
+                'reused_connections': reused,
+                'reuse_ratio': reused / self._requests if self._requests else 0.0
+            }
+
+    def close(self):
+        self.session.close()
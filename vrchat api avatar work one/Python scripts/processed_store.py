@@ -0,0 +1,101 @@
+import os
+import sys
+import threading
+
+
+class ProcessedStore:
+    """Indexed view of discord_avatar_check.txt
+
+    The file is read once into a set so membership checks are O(1), and new
+    IDs are buffered and appended in batches instead of one open() per avatar.
+    The on-disk format is unchanged (one avatar ID per line, '#' comments).
+    """
+
+    def __init__(self, path, batch_size=100):
+        self.path = path
+        self.batch_size = batch_size
+        self._ids = set()
+        self._pending = []
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        """Load every ID already in the log file"""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#'):
+                    self._ids.add(line)
+
+    def __contains__(self, avatar_id):
+        return avatar_id in self._ids
+
+    def __len__(self):
+        return len(self._ids)
+
+    def add(self, avatar_id):
+        """Mark an avatar as processed, returns False if it already was"""
+        with self._lock:
+            if avatar_id in self._ids:
+                return False
+            self._ids.add(avatar_id)
+            self._pending.append(avatar_id)
+            if len(self._pending) >= self.batch_size:
+                self._flush_locked()
+            return True
+
+    def add_many(self, avatar_ids):
+        """Mark several avatars as processed with a single append"""
+        added = 0
+        with self._lock:
+            for avatar_id in avatar_ids:
+                avatar_id = avatar_id.strip()
+                if avatar_id and not avatar_id.startswith('#') and avatar_id not in self._ids:
+                    self._ids.add(avatar_id)
+                    self._pending.append(avatar_id)
+                    added += 1
+            self._flush_locked()
+        return added
+
+    def import_file(self, filename):
+        """Merge IDs from another processed log (one ID per line)"""
+        with open(filename, 'r', encoding='utf-8', errors='replace') as f:
+            return self.add_many(f)
+
+    def flush(self):
+        """Write any buffered IDs to disk"""
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._pending:
+            return
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write("".join(f"{avatar_id}\n" for avatar_id in self._pending))
+        self._pending = []
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def main():
+    if len(sys.argv) != 3 or sys.argv[1] != "import":
+        print("Usage: python processed_store.py import <file>")
+        sys.exit(1)
+
+    check_file = os.path.join(os.path.dirname(__file__), 'discord_avatar_check.txt')
+    with ProcessedStore(check_file) as store:
+        added = store.import_file(sys.argv[2])
+        print(f"[✓] Imported {added} new avatar IDs ({len(store)} total)")
+
+
+if __name__ == "__main__":
+    main()
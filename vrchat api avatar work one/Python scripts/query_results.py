@@ -0,0 +1,77 @@
+import argparse
+import json
+import sys
+
+from result_sink import open_result_file, result_files
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Search avatar results written by avatar_info.py")
+    parser.add_argument('--file', default='api_log.jsonl',
+                        help="result log to search, rotated and compressed parts are included (default: api_log.jsonl)")
+    parser.add_argument('--author', help="author name (case-insensitive)")
+    parser.add_argument('--platform', help="platform, e.g. PC, Quest or 'PC & Quest'")
+    parser.add_argument('--release-status', help="release status, e.g. public or private")
+    parser.add_argument('--status', help="result status: success or error")
+    parser.add_argument('--limit', type=int, default=0, help="stop after this many matches")
+    parser.add_argument('--count', action='store_true', help="only print the number of matches")
+    parser.add_argument('--json', action='store_true', help="print matching records as JSON lines")
+    return parser.parse_args()
+
+
+def build_filters(args):
+    """Field name -> lowercase value the record must have"""
+    filters = {
+        'author_name': args.author,
+        'platform': args.platform,
+        'release_status': args.release_status,
+        'status': args.status,
+    }
+    return {field: value.lower() for field, value in filters.items() if value}
+
+
+def iter_matches(path, filters):
+    """Stream records from every result file, parsing only lines that can match"""
+    # Cheap substring check on the raw line before paying for json.loads; the
+    # values are escaped like ResultSink writes them so quotes and backslashes match
+    needles = [json.dumps(value, ensure_ascii=False)[1:-1] for value in filters.values()]
+    for filename in result_files(path):
+        with open_result_file(filename) as f:
+            for line in f:
+                lowered = line.lower()
+                if any(needle not in lowered for needle in needles):
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if all(str(record.get(field, '')).lower() == value for field, value in filters.items()):
+                    yield record
+
+
+def main():
+    args = parse_args()
+    filters = build_filters(args)
+
+    matches = 0
+    for record in iter_matches(args.file, filters):
+        matches += 1
+        if not args.count:
+            if args.json:
+                print(json.dumps(record, ensure_ascii=False))
+            elif record.get('status') == 'error':
+                print(f"{record['id']}  ERROR  {record.get('error', '')}")
+            else:
+                print(f"{record['id']}  {record.get('name')}  by {record.get('author_name')}  "
+                      f"[{record.get('release_status')}, {record.get('platform')}]")
+        if args.limit and matches >= args.limit:
+            break
+
+    if args.count:
+        print(matches)
+    elif not matches:
+        print("No matching avatars found", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
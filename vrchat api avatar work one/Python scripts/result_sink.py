@@ -0,0 +1,121 @@
+import glob
+import gzip
+import json
+import os
+import threading
+from datetime import datetime, timezone
+
+
+def _open_log(path, compress):
+    if compress:
+        # Appending to a gzip file adds a new member, which readers handle transparently
+        return gzip.open(path, 'at', encoding='utf-8')
+    return open(path, 'a', encoding='utf-8', buffering=1024 * 1024)
+
+
+def result_files(path):
+    """All result logs for a base path, rotated files oldest first and the live files last"""
+    base = path[:-3] if path.endswith('.gz') else path
+    root, ext = os.path.splitext(base)
+    rotated = sorted(glob.glob(f"{root}-*{ext}") + glob.glob(f"{root}-*{ext}.gz"))
+    live = [p for p in (base, base + '.gz') if os.path.exists(p)]
+    return rotated + live
+
+
+def open_result_file(path):
+    """Open a plain or gzip compressed result log for reading"""
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8', errors='replace')
+    return open(path, 'r', encoding='utf-8', errors='replace')
+
+
+class ResultSink:
+    """Long-lived, buffered JSON Lines writer for avatar results
+
+    One file handle stays open for the whole run. Records are written into a
+    large buffer that a background thread flushes every flush_interval
+    seconds (and on close), so an idle daemon doesn't sit on results,
+    and the file is rotated to <name>-<timestamp>.jsonl once it grows past
+    max_bytes of JSON.
+
+    Args:
+        path (str): Result log, e.g. api_log.jsonl (.gz is added when compressing)
+        compress (bool): Write gzip compressed output
+        flush_interval (float): Longest time records stay buffered in seconds
+        max_bytes (int): Rotate after this many bytes of JSON (0 disables rotation)
+    """
+
+    def __init__(self, path='api_log.jsonl', compress=False, flush_interval=5.0, max_bytes=100 * 1024 * 1024):
+        if compress and not path.endswith('.gz'):
+            path += '.gz'
+        self.path = path
+        self.compress = compress
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.written = 0
+        self._lock = threading.Lock()
+        self._file = _open_log(path, compress)
+        self._bytes = os.path.getsize(path) if os.path.exists(path) and not compress else 0
+        self._dirty = False
+        self._closed = threading.Event()
+        if flush_interval and flush_interval > 0:
+            threading.Thread(target=self._flush_loop, daemon=True).start()
+
+    @classmethod
+    def from_config(cls, results_config):
+        """Build a sink from the 'results' section of config.json"""
+        return cls(
+            path=results_config.get('file', 'api_log.jsonl'),
+            compress=results_config.get('compress', False),
+            flush_interval=results_config.get('flush_interval', 5.0),
+            max_bytes=int(results_config.get('max_mb', 100) * 1024 * 1024)
+        )
+
+    def write(self, info):
+        """Append one avatar result"""
+        record = dict(info, logged_at=datetime.now(timezone.utc).isoformat(timespec='seconds'))
+        line = json.dumps(record, ensure_ascii=False) + '\n'
+        with self._lock:
+            self._file.write(line)
+            self._bytes += len(line.encode('utf-8'))
+            self.written += 1
+            self._dirty = True
+            if self.max_bytes and self._bytes >= self.max_bytes:
+                self._rotate_locked()
+
+    def _flush_loop(self):
+        """Flush buffered records every flush_interval seconds until closed"""
+        while not self._closed.wait(self.flush_interval):
+            with self._lock:
+                if self._dirty and not self._file.closed:
+                    self._flush_locked()
+
+    def _flush_locked(self):
+        self._file.flush()
+        self._dirty = False
+
+    def _rotate_locked(self):
+        self._file.close()
+        root, ext = os.path.splitext(self.path[:-3] if self.compress else self.path)
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+        rotated = f"{root}-{stamp}{ext}" + ('.gz' if self.compress else '')
+        os.replace(self.path, rotated)
+        self._file = _open_log(self.path, self.compress)
+        self._bytes = 0
+        self._dirty = False
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def close(self):
+        self._closed.set()
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,107 @@
+import json
+import os
+import threading
+import time
+
+
+class RunJournal:
+    """Append-only record of how far each avatar got in a run
+
+    Every avatar goes through up to three states, each written as one JSON
+    line:
+        fetched   - the result is known (stored in the entry, so a resumed
+                    run never calls the API for it again)
+        delivered - Discord accepted the message carrying it
+        logged    - it was printed and written to the result log
+
+    Writes are buffered and fsync'd every fsync_every records or
+    fsync_interval seconds, whichever comes first, and on close. A crash
+    can lose at most the last unsynced batch, which a resumed run simply
+    does again.
+
+    Args:
+        path (str): Journal file
+        truncate (bool): Start a new journal instead of appending
+        fsync_every (int): Records between fsyncs
+        fsync_interval (float): Longest time between fsyncs in seconds
+    """
+
+    def __init__(self, path, truncate=False, fsync_every=100, fsync_interval=1.0):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self._file = open(path, 'w' if truncate else 'a', encoding='utf-8')
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def replay(path):
+        """Read a journal back into (unfinished, finished)
+
+        unfinished is {avatar_id: {'states': set, 'result': dict, 'notify': bool}}
+        for avatars that still have to be delivered or logged. Every other
+        fetched avatar only goes into finished as {avatar_id: bool}, True if
+        it was a success delivered to Discord, so resuming a long run doesn't
+        hold every result in memory. A torn last line from a crash is ignored.
+        """
+        unfinished = {}
+        finished = {}
+        if not os.path.exists(path):
+            return unfinished, finished
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                avatar_id, state = record['id'], record['state']
+                if state == 'fetched':
+                    # Fetched again (e.g. a later --daemon pass): start over
+                    finished.pop(avatar_id, None)
+                    unfinished[avatar_id] = {'states': set(), 'result': record.get('result'),
+                                             'notify': record.get('notify', False)}
+                entry = unfinished.get(avatar_id)
+                if entry is None:
+                    continue  # Already finished, or its fetched line was lost
+                entry['states'].add(state)
+                if 'logged' in entry['states'] and (not entry['notify'] or 'delivered' in entry['states']):
+                    del unfinished[avatar_id]
+                    finished[avatar_id] = ('delivered' in entry['states']
+                                           and (entry['result'] or {}).get('status') == 'success')
+        return unfinished, finished
+
+    def record(self, avatar_id, state, **fields):
+        """Append a state change for an avatar"""
+        line = json.dumps(dict({'id': avatar_id, 'state': state}, **fields), ensure_ascii=False)
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.write(line + '\n')
+            self._unsynced += 1
+            if (self._unsynced >= self.fsync_every
+                    or time.monotonic() - self._last_sync >= self.fsync_interval):
+                self._sync_locked()
+
+    def _sync_locked(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def sync(self):
+        with self._lock:
+            if not self._file.closed:
+                self._sync_locked()
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._sync_locked()
+                self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()